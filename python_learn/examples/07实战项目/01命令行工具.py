@@ -4,97 +4,2542 @@
 Python命令行工具项目示例
 """
 
-import argparse
 import sys
 import os
+
+# 守护进程运行时先用轻量客户端转发命令，省去编译下面的代码和导入较重模块的开销
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if _SCRIPT_DIR not in sys.path:
+    # 其他脚本按文件路径导入本模块时，同目录的 task_client 不在搜索路径中
+    sys.path.insert(0, _SCRIPT_DIR)
+from task_client import forward, send_to_daemon
+
+if __name__ == "__main__" and forward(sys.argv[1:]):
+    sys.exit()
+
+import argparse
+import io
+import functools
+import operator
+import socket
+import socketserver
+import contextlib
+import re
 import json
 import csv
-from datetime import datetime
+import gzip
+import lzma
+import signal
+import shutil
+import tempfile
+import multiprocessing
+import mmap
+import struct
+import sqlite3
+import heapq
+import itertools
+import math
+import threading
+import time
+import weakref
+from array import array
+from datetime import datetime, date, timedelta
 from typing import List, Dict, Any
 
+try:
+    import fcntl
+except ImportError:
+    # Windows 没有 fcntl，此时不做跨进程加锁
+    fcntl = None
+
 # 1. 任务管理器类
 print("=== 1. 任务管理器类 ===")
 
+PRIORITIES = ("low", "medium", "high")
+STATUSES = ("pending", "completed")
+
+
+class PagedColumn:
+    """分页保存的一列，写时复制以页为单位
+
+    每页最多 PAGE_SIZE 行，page 是创建一页的函数（list、bytearray 等），
+    page(旧页) 得到它的副本。snapshot() 返回与本列共享所有页的只读视图，并给本列
+    换一个新的所有者标记：之后修改某一页时，这一页不属于当前标记就先复制它；
+    页列表本身（每页一个引用）也只在快照后第一次修改时复制一次。
+    """
+
+    PAGE_SIZE = 4096
+
+    def __init__(self, page=list, values=()):
+        self.page = page
+        self.pages = [page(values[start:start + self.PAGE_SIZE])
+                      for start in range(0, len(values), self.PAGE_SIZE)]
+        self.token = object()
+        # owners[i] 是第 i 页的所有者标记，与 token 相同时可以原地修改
+        self.owners = [self.token] * len(self.pages)
+        # pages/owners 列表是否仍与快照共享
+        self.shared = False
+
+    def __len__(self):
+        if not self.pages:
+            return 0
+        return (len(self.pages) - 1) * self.PAGE_SIZE + len(self.pages[-1])
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self.pages)
+
+    def __getitem__(self, pos):
+        page, slot = divmod(pos, self.PAGE_SIZE)
+        return self.pages[page][slot]
+
+    def __setitem__(self, pos, value):
+        page, slot = divmod(pos, self.PAGE_SIZE)
+        self._writable(page)[slot] = value
+
+    def append(self, value):
+        self.tail().append(value)
+
+    def tail(self):
+        """可以原地追加的最后一页（最后一页已满时新建一页）"""
+        if not self.pages or len(self.pages[-1]) == self.PAGE_SIZE:
+            return self._add_page()
+        return self._writable(len(self.pages) - 1)
+
+    def _own_pages(self):
+        if self.shared:
+            self.pages, self.owners = self.pages[:], self.owners[:]
+            self.shared = False
+
+    def _writable(self, i: int):
+        """第 i 页，仍与快照共享时先复制"""
+        if self.owners[i] is not self.token:
+            self._own_pages()
+            self.pages[i] = self.page(self.pages[i])
+            self.owners[i] = self.token
+        return self.pages[i]
+
+    def _add_page(self):
+        self._own_pages()
+        self.pages.append(self.page())
+        self.owners.append(self.token)
+        return self.pages[-1]
+
+    def snapshot(self):
+        """O(1) 创建共享所有页的只读视图"""
+        view = type(self).__new__(type(self))
+        view.__dict__.update(self.__dict__)
+        view.token = object()
+        view.shared = self.shared = True
+        self.token = object()
+        return view
+
+
+class PagedIndex(PagedColumn):
+    """按任务ID分页的字典：第 i 页保存 i*PAGE_SIZE 到 (i+1)*PAGE_SIZE-1 的ID"""
+
+    def __init__(self):
+        super().__init__(dict)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        i = key // self.PAGE_SIZE
+        if i < len(self.pages) and self.owners[i] is self.token:
+            page = self.pages[i]
+        else:
+            while len(self.pages) <= i:
+                self._add_page()
+            page = self._writable(i)
+        self.count += key not in page
+        page[key] = value
+
+    def get(self, key, default=None):
+        page = key // self.PAGE_SIZE
+        return self.pages[page].get(key, default) if page < len(self.pages) else default
+
+    def pop(self, key, *default):
+        if key not in self:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        self.count -= 1
+        return self._writable(key // self.PAGE_SIZE).pop(key)
+
+    def values(self):
+        return itertools.chain.from_iterable(page.values() for page in self.pages)
+
+
+class TaskStore:
+    """列式任务存储（struct-of-arrays）
+
+    每个字段一列：ID和时间用 array('q') 保存，优先级和状态保存为
+    PRIORITIES/STATUSES 中的下标（bytearray），创建/完成时间是本地时间
+    相对1970-01-01的秒数，截止日期是 date.toordinal()，缺失值用 MISSING。
+    只有标题和描述仍是字符串。按ID读取时才组装成字典（get/row）。
+    各列都是分页的 PagedColumn，_index（任务ID到行号的映射）是 PagedIndex。
+
+    旧版本不校验截止日期，文件中可能有 "2024/12/31" 这样无法解析的值：
+    这类值原样保存在 _raw_due 中（截止日期列记为 MISSING，不参与到期查询），
+    读取和保存时照常输出，不会让整个文件无法加载。
+
+    删除时只把该行的ID改成 MISSING（墓碑），其余行保持原来的顺序；墓碑超过一半时
+    compact() 重建各列。任务一般按ID递增的顺序追加，遍历（iter_ids/iter_rows）
+    按行号跳过墓碑即可；分片存储按需加载时可能乱序追加，此时 _ordered 为 False，
+    遍历时按ID排序。
+
+    snapshot() 返回与当前存储共享所有页的只读视图；之后的修改只复制它写到的页
+    （写时复制），例如追加只复制各列的最后一页，完成任务只复制状态和完成时间两列中的一页。
+    """
+
+    MISSING = -1 << 62
+    EPOCH = datetime(1970, 1, 1)
+    COLUMNS = ("ids", "titles", "priorities", "statuses", "created_at",
+               "due_dates", "descriptions", "completed_at", "_index", "_raw_due")
+    INT_PAGE = functools.partial(array, 'q')
+
+    def __init__(self):
+        self.ids = PagedColumn(self.INT_PAGE)
+        self.titles = PagedColumn(list)
+        self.priorities = PagedColumn(bytearray)
+        self.statuses = PagedColumn(bytearray)
+        self.created_at = PagedColumn(self.INT_PAGE)
+        self.due_dates = PagedColumn(self.INT_PAGE)
+        self.descriptions = PagedColumn(list)
+        self.completed_at = PagedColumn(self.INT_PAGE)
+        self._index = PagedIndex()
+        self._raw_due = PagedIndex()
+        # 墓碑行数；各行是否按ID递增排列，以及追加过的最大ID
+        self._dead = 0
+        self._ordered = True
+        self._max_id = 0
+        # 各列可以原地追加的最后一页（快照或重建后失效）
+        self._tail = None
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, task_id):
+        return task_id in self._index
+
+    @classmethod
+    def _encode_time(cls, text):
+        if text is None:
+            return cls.MISSING
+        return int((datetime.fromisoformat(text) - cls.EPOCH).total_seconds())
+
+    @classmethod
+    def _decode_time(cls, seconds):
+        if seconds == cls.MISSING:
+            return None
+        return (cls.EPOCH + timedelta(seconds=seconds)).isoformat(sep=' ')
+
+    @classmethod
+    def _encode_date(cls, text):
+        """截止日期的 toordinal()；无法解析时抛出 ValueError"""
+        return cls.MISSING if text is None else date.fromisoformat(text).toordinal()
+
+    @classmethod
+    def _decode_date(cls, ordinal):
+        return None if ordinal == cls.MISSING else date.fromordinal(ordinal).isoformat()
+
+    def append(self, task: Dict[str, Any]):
+        """追加一行"""
+        task_id = task["id"]
+        if task_id < self._max_id:
+            self._ordered = False
+        self._max_id = max(self._max_id, task_id)
+        tail = self._tail
+        if tail is None or len(tail[0]) == PagedColumn.PAGE_SIZE:
+            # 快照或重建之后、最后一页已满时，才需要复制或新建各列的最后一页
+            tail = self._tail = tuple(getattr(self, name).tail() for name in self.COLUMNS[:-2])
+        ids, titles, priorities, statuses, created_at, due_dates, descriptions, completed_at = tail
+
+        self._index[task_id] = (len(self.ids.pages) - 1) * PagedColumn.PAGE_SIZE + len(ids)
+        ids.append(task_id)
+        titles.append(task["title"])
+        priorities.append(PRIORITIES.index(task["priority"]))
+        statuses.append(STATUSES.index(task["status"]))
+        created_at.append(self._encode_time(task["created_at"]))
+        try:
+            due_dates.append(self._encode_date(task["due_date"]))
+        except (TypeError, ValueError):
+            due_dates.append(self.MISSING)
+            self._raw_due[task_id] = task["due_date"]
+        # 空描述共用同一个字符串对象
+        descriptions.append(task["description"] or "")
+        completed_at.append(self._encode_time(task["completed_at"]))
+
+    def remove(self, task_id: int):
+        """删除一行（留下墓碑，其余行的顺序不变）"""
+        pos = self._index.pop(task_id)
+        self._raw_due.pop(task_id, None)
+        self.ids[pos] = self.MISSING
+        self._dead += 1
+        if self._dead * 2 > len(self.ids):
+            self.compact()
+
+    def compact(self):
+        """去掉墓碑，按ID顺序重建各列（新建的列不再与快照共享）"""
+        positions = self.positions()
+        for name in self.COLUMNS[:-2]:
+            column = getattr(self, name)
+            setattr(self, name, PagedColumn(column.page, [column[pos] for pos in positions]))
+        self._index = PagedIndex()
+        for pos, task_id in enumerate(self.ids):
+            self._index[task_id] = pos
+        self._dead = 0
+        self._ordered = True
+        self._tail = None
+
+    def complete(self, task_id: int, completed_at: str):
+        """把任务标记为已完成"""
+        pos = self._index[task_id]
+        self.statuses[pos] = STATUSES.index("completed")
+        self.completed_at[pos] = self._encode_time(completed_at)
+
+    def status(self, task_id: int) -> str:
+        return STATUSES[self.statuses[self._index[task_id]]]
+
+    def priority(self, task_id: int) -> str:
+        return PRIORITIES[self.priorities[self._index[task_id]]]
+
+    def due_ordinal(self, task_id: int) -> int:
+        """截止日期的 toordinal()，没有截止日期时为 MISSING"""
+        return self.due_dates[self._index[task_id]]
+
+    def row(self, pos: int) -> Dict[str, Any]:
+        """把第 pos 行组装成任务字典"""
+        page, slot = divmod(pos, PagedColumn.PAGE_SIZE)
+        task_id = self.ids.pages[page][slot]
+        return {
+            "id": task_id,
+            "title": self.titles.pages[page][slot],
+            "priority": PRIORITIES[self.priorities.pages[page][slot]],
+            "status": STATUSES[self.statuses.pages[page][slot]],
+            "created_at": self._decode_time(self.created_at.pages[page][slot]),
+            "due_date": (self._decode_date(self.due_dates.pages[page][slot])
+                         or self._raw_due.get(task_id)),
+            "description": self.descriptions.pages[page][slot],
+            "completed_at": self._decode_time(self.completed_at.pages[page][slot])
+        }
+
+    def get(self, task_id: int):
+        """按ID组装任务字典，不存在时返回None"""
+        pos = self._index.get(task_id)
+        return None if pos is None else self.row(pos)
+
+    def positions(self) -> List[int]:
+        """按任务ID顺序排列的有效行号（跳过墓碑）"""
+        if not self._ordered:
+            return sorted(self._index.values(), key=self.ids.__getitem__)
+        if not self._dead:
+            return range(len(self.ids))
+        return [pos for pos, task_id in enumerate(self.ids) if task_id != self.MISSING]
+
+    def iter_ids(self):
+        """按ID顺序产生任务ID"""
+        ids = self.ids
+        return (ids[pos] for pos in self.positions())
+
+    def iter_rows(self):
+        """按ID顺序逐行产生任务字典"""
+        for pos in self.positions():
+            yield self.row(pos)
+
+    def snapshot(self):
+        """O(1) 创建只读快照，不复制任何数据"""
+        view = TaskStore.__new__(TaskStore)
+        for name in self.COLUMNS:
+            setattr(view, name, getattr(self, name).snapshot())
+        view._dead, view._ordered, view._max_id = self._dead, self._ordered, self._max_id
+        view._tail = self._tail = None
+        return view
+
+
+class TaskList:
+    """按ID引用任务的只读序列，遍历时才从 TaskStore 组装字典"""
+
+    def __init__(self, store: TaskStore, ids):
+        self.store = store
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return TaskList(self.store, self.ids[i])
+        return self.store.get(self.ids[i])
+
+    def __iter__(self):
+        for task_id in self.ids:
+            task = self.store.get(task_id)
+            # 返回之后被删除的任务直接跳过
+            if task is not None:
+                yield task
+
+
+class TaskJournal:
+    """追加式任务日志
+
+    每次修改只向日志末尾追加一行JSON记录，加载时在最近一次快照上重放日志。
+    日志记录数超过阈值后，由后台线程写出新快照并截断日志（压缩）。
+    offset 是当前日志已经读到的位置，其他进程追加记录后只需读取新增的部分。
+    """
+
+    def __init__(self, filename: str, compact_threshold: int = 10000):
+        self.filename = filename
+        self.old_filename = filename + ".old"
+        self.compact_lock_filename = filename + ".compact"
+        self.compact_threshold = compact_threshold
+        self.count = 0
+        self.offset = 0
+        self._compactor = None
+        self._compact_lock = None
+
+    def _read_file(self, name: str, start: int):
+        """从 start 开始逐行读取记录，产生 (记录, 该行结束位置)"""
+        if not os.path.exists(name):
+            return
+        with open(name, 'rb') as f:
+            f.seek(start)
+            for line in f:
+                # 没有换行符的最后一行可能还没写完，留到下次再读
+                if not line.endswith(b"\n"):
+                    return
+                start += len(line)
+                try:
+                    yield json.loads(line), start
+                except json.JSONDecodeError:
+                    # 崩溃时留下的半行记录，直接忽略
+                    continue
+
+    def read_records(self):
+        """按顺序读取全部待重放的记录（先读压缩中的旧日志，再读当前日志）"""
+        for record, _ in self._read_file(self.old_filename, 0):
+            yield record
+        self.offset = 0
+        yield from self.read_new_records()
+
+    def read_new_records(self):
+        """读取当前日志中 offset 之后新增的记录"""
+        for record, end in self._read_file(self.filename, self.offset):
+            self.offset = end
+            yield record
+
+    def append(self, records: List[Dict[str, Any]]):
+        """追加记录（调用者必须持有任务文件锁并已读完日志）"""
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        with open(self.filename, 'ab') as f:
+            # 日志末尾有崩溃留下的半行时先补一个换行，避免新记录被拼接到坏行上
+            if f.tell() > self.offset:
+                f.write(b"\n")
+            f.write(data.encode('utf-8'))
+            self.offset = f.tell()
+        self.count += len(records)
+
+    def should_compact(self):
+        """是否需要压缩"""
+        return self.count >= self.compact_threshold and not self.is_compacting()
+
+    def is_compacting(self):
+        """后台压缩是否正在进行"""
+        return self._compactor is not None and self._compactor.is_alive()
+
+    def begin_compaction(self) -> bool:
+        """轮换日志，准备压缩（调用者必须持有任务文件锁）
+
+        当前日志改名为 .old，之后的修改写入新日志，快照写完后再删除 .old。
+        压缩期间持有 .compact 文件锁；.old 已存在而这把锁无人持有，说明是之前
+        崩溃留下的，此时把当前日志并入 .old，由这次的新快照一起覆盖。
+        """
+        if self.is_compacting():
+            return False
+        lock_file = open(self.compact_lock_filename, 'a')
+        if fcntl:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                # 其他进程正在压缩
+                lock_file.close()
+                return False
+
+        if os.path.exists(self.old_filename):
+            if os.path.exists(self.filename):
+                with open(self.filename, 'rb') as src, open(self.old_filename, 'ab') as dst:
+                    dst.write(b"\n" + src.read())
+                os.remove(self.filename)
+        elif os.path.exists(self.filename):
+            os.replace(self.filename, self.old_filename)
+        self.count = 0
+        self.offset = 0
+        self._compact_lock = lock_file
+        return True
+
+    def start_compaction(self, write_snapshot):
+        """在后台线程中执行 write_snapshot，结束后释放压缩锁"""
+        def run():
+            try:
+                write_snapshot()
+            finally:
+                self._compact_lock.close()
+                self._compact_lock = None
+
+        self._compactor = threading.Thread(target=run, name="journal-compactor")
+        self._compactor.start()
+
+    def finish_compaction(self):
+        """快照已替换，删除已合并的旧日志（调用者必须持有任务文件锁）"""
+        if os.path.exists(self.old_filename):
+            os.remove(self.old_filename)
+
+    def wait(self):
+        """等待后台压缩结束"""
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+
+
+class AutoSaver:
+    """防抖的后台自动保存
+
+    mark_dirty 只记录待保存的修改数；后台线程在最后一次修改后静默 interval 秒，
+    或待保存的修改达到 max_pending 条时才调用 flush，连续多次修改只写一次文件。
+    """
+
+    def __init__(self, flush, interval: float = 1.0, max_pending: int = 100):
+        self.flush = flush
+        self.interval = interval
+        self.max_pending = max_pending
+        self.pending = 0
+        self.last_modified = 0.0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def dirty(self) -> bool:
+        return self.pending > 0
+
+    def mark_dirty(self, count: int = 1):
+        """记录 count 条尚未保存的修改"""
+        with self._cond:
+            self.pending += count
+            self.last_modified = time.monotonic()
+            self._cond.notify()
+
+    def _run(self):
+        with self._cond:
+            while True:
+                while not self.pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                remaining = self.last_modified + self.interval - time.monotonic()
+                if remaining > 0 and self.pending < self.max_pending:
+                    self._cond.wait(remaining)
+                    continue
+                self.pending = 0
+                # 写文件时不持有条件变量，前台可以继续记录新的修改
+                self._cond.release()
+                try:
+                    self.flush()
+                finally:
+                    self._cond.acquire()
+
+    def close(self):
+        """停止后台线程（尚未保存的修改由调用者 flush）"""
+        with self._cond:
+            self._closed = True
+            self.pending = 0
+            self._cond.notify()
+        self._thread.join()
+
+
+class TaskSnapshot:
+    """某一时刻的只读任务视图
+
+    由 TaskManager.snapshot() 创建，与任务管理器写时复制地共享 TaskStore 的列，
+    创建是O(1)的。之后的修改不会影响快照，遍历快照时也不需要持有任何锁。
+    """
+
+    def __init__(self, store: TaskStore, stats: Dict[str, Any], version: int):
+        self.store = store
+        self.stats = stats
+        self.version = version
+
+    def __len__(self):
+        return len(self.store)
+
+    def get_task(self, task_id: int):
+        return self.store.get(task_id)
+
+    def iter_tasks(self):
+        return self.store.iter_rows()
+
+    def get_task_stats(self):
+        return dict(self.stats, priorities=dict(self.stats["priorities"]))
+
+    def close(self):
+        """内存快照不占用资源，由垃圾回收释放"""
+
+
+class TaskArchive:
+    """已完成任务的冷存储
+
+    <filename> 只追加写入，每次归档压缩成一个独立的块（gzip 或 lzma）；
+    <filename>.idx 每行记录一个块的偏移、长度、压缩方式、ID范围和各优先级的任务数。
+    统计只读索引，导出时才逐块解压。先写块再写索引，中途崩溃留下的块没有索引，会被忽略。
+    """
+
+    CODECS = {"gzip": gzip, "lzma": lzma}
+
+    def __init__(self, filename: str, codec: str = "gzip"):
+        self.filename = filename
+        self.index_filename = filename + ".idx"
+        self.codec = codec
+
+    def read_index(self) -> List[Dict[str, Any]]:
+        """读取索引（忽略写了一半的最后一行）"""
+        entries = []
+        if not os.path.exists(self.index_filename):
+            return entries
+        with open(self.index_filename, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.endswith("\n"):
+                    entries.append(json.loads(line))
+        return entries
+
+    def append(self, tasks: List[Dict[str, Any]]):
+        """把一批已完成的任务压缩成一个块追加到归档（调用者必须持有锁）"""
+        data = "".join(json.dumps(task, ensure_ascii=False) + "\n" for task in tasks)
+        block = self.CODECS[self.codec].compress(data.encode('utf-8'))
+        with open(self.filename, 'ab') as f:
+            f.seek(0, os.SEEK_END)
+            offset = f.tell()
+            f.write(block)
+            f.flush()
+            os.fsync(f.fileno())
+
+        entry = {"offset": offset, "length": len(block), "codec": self.codec,
+                 "count": len(tasks),
+                 "min_id": min(task["id"] for task in tasks),
+                 "max_id": max(task["id"] for task in tasks)}
+        for priority in PRIORITIES:
+            entry[priority] = sum(task["priority"] == priority for task in tasks)
+        with open(self.index_filename, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def stats(self) -> Dict[str, Any]:
+        """归档中的任务数和各优先级的任务数（只读索引）"""
+        entries = self.read_index()
+        return {
+            "count": sum(entry["count"] for entry in entries),
+            "priorities": {pri: sum(entry[pri] for entry in entries) for pri in PRIORITIES}
+        }
+
+    def iter_tasks(self):
+        """逐块解压，遍历归档中的任务"""
+        entries = self.read_index()
+        if not entries:
+            return
+        with open(self.filename, 'rb') as f:
+            for entry in entries:
+                f.seek(entry["offset"])
+                data = self.CODECS[entry["codec"]].decompress(f.read(entry["length"]))
+                for line in data.decode('utf-8').splitlines():
+                    yield json.loads(line)
+
+
+# 持有自动保存锁（_lease）的任务管理器
+_LEASED_MANAGERS = weakref.WeakSet()
+
+
+def _drop_leases_after_fork():
+    """fork 出的子进程继承了加锁的文件描述符，关闭这些副本，否则父进程释放后锁仍被子进程占着"""
+    for manager in list(_LEASED_MANAGERS):
+        manager._lease.close()
+        manager._lease = None
+        manager.autosave = None
+        manager._thread_lock = threading.Lock()
+    _LEASED_MANAGERS.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_drop_leases_after_fork)
+
+
+CJK_CHARS = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af'
+TOKEN_PATTERN = re.compile(f'[{CJK_CHARS}]+|[0-9a-z\u00c0-\u024f]+')
+
+
+def tokenize(text: str, for_query: bool = False) -> List[str]:
+    """切分文本：拉丁文字按单词（转小写），中日韩文字按单字和相邻两字
+
+    查询时连续的中日韩文字只取相邻两字（包含这两字的文档必然也包含各个单字）。
+    """
+    tokens = []
+    for run in TOKEN_PATTERN.findall(text.lower()):
+        if not ('\u3040' <= run[0] <= '\ud7af'):
+            tokens.append(run)
+            continue
+        bigrams = [run[i:i + 2] for i in range(len(run) - 1)]
+        if for_query and bigrams:
+            tokens.extend(bigrams)
+        else:
+            tokens.extend(run)
+            tokens.extend(bigrams)
+    return tokens
+
+
+class SearchIndex:
+    """标题和描述的倒排索引
+
+    postings[词] = {任务ID: 词频}，标题中的词按 TITLE_WEIGHT 倍计入词频。
+    查询由 OR 分隔成若干组，组内各词必须同时出现；按 TF-IDF 得分排序。
+    """
+
+    TITLE_WEIGHT = 2
+
+    def __init__(self):
+        self.postings = {}
+        self.doc_count = 0
+
+    def _term_counts(self, title: str, description: str) -> Dict[str, int]:
+        counts = {}
+        for token in tokenize(title):
+            counts[token] = counts.get(token, 0) + self.TITLE_WEIGHT
+        for token in tokenize(description or ""):
+            counts[token] = counts.get(token, 0) + 1
+        return counts
+
+    def add(self, task_id: int, title: str, description: str):
+        """索引一个任务"""
+        for token, count in self._term_counts(title, description).items():
+            self.postings.setdefault(token, {})[task_id] = count
+        self.doc_count += 1
+
+    def remove(self, task_id: int, title: str, description: str):
+        """从索引中移除一个任务"""
+        for token in self._term_counts(title, description):
+            docs = self.postings[token]
+            del docs[task_id]
+            if not docs:
+                del self.postings[token]
+        self.doc_count -= 1
+
+    def search(self, query: str, limit: int = None) -> List[int]:
+        """查询，返回按得分从高到低排列的任务ID"""
+        scores = {}
+        for group in re.split(r'\s+OR\s+', query.strip()):
+            tokens = list(dict.fromkeys(tokenize(group, for_query=True)))
+            if not tokens:
+                continue
+            postings = [self.postings.get(token, {}) for token in tokens]
+            # 从最短的倒排表开始求交集
+            postings.sort(key=len)
+            for task_id in postings[0]:
+                if all(task_id in docs for docs in postings[1:]):
+                    score = sum(docs[task_id] * math.log(1 + self.doc_count / len(docs))
+                                for docs in postings)
+                    scores[task_id] = max(scores.get(task_id, 0), score)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0])) \
+            if limit is None else heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [task_id for task_id, _ in ranked]
+
+
+FILTER_FIELDS = ("id", "title", "description", "priority", "status",
+                 "created_at", "due_date", "completed_at")
+# 可以用 ~ 做子串匹配的文本字段
+FILTER_TEXT_FIELDS = ("title", "description")
+FILTER_OPERATORS = {"=": operator.eq, "==": operator.eq, "!=": operator.ne,
+                    "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+FILTER_TOKEN_PATTERN = re.compile(
+    r'\s*(?:"([^"]*)"|\'([^\']*)\'|(<=|>=|!=|==|=|<|>|~|\(|\)|,)|([^\s()<>=!~,\'"]+))')
+
+
+class TaskFilter:
+    """编译后的 --where 过滤表达式
+
+    语法示例：
+      priority in (high, medium) and due_date <= today+7
+      status = pending and (title ~ 报告 or created_at >= 2024-01-01)
+      not due_date = null
+
+    比较运算符 = != < <= > >=，集合 in / not in，子串匹配 ~（不区分大小写），
+    用 and / or / not 和括号组合。日期可以写成 YYYY-MM-DD、today、today+7、today-2w；
+    created_at / completed_at 与日期比较时只比较日期部分。null 表示没有值。
+
+    表达式只解析一次，编译成由闭包组成的 predicate；同时从顶层的 and 条件中提取
+    statuses / priorities / due_until，供 list_tasks 选择索引缩小候选范围。
+    today 是解析 today±N 时使用的日期（默认当天），编译结果只在这一天有效。
+    """
+
+    def __init__(self, expression: str, today: date = None):
+        self.expression = expression
+        self.today = today or date.today()
+        self.tokens = self._tokenize(expression)
+        self.pos = 0
+        tree = self._parse_or()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"过滤表达式在 '{self.tokens[self.pos][1]}' 处无法解析")
+        self.predicate = self._compile(tree)
+        self.statuses = None
+        self.priorities = None
+        self.due_until = None
+        self._plan(tree)
+
+    # 词法分析：每个记号为 (类型, 文本)，类型是 str / op / word
+    @staticmethod
+    def _tokenize(expression: str):
+        tokens = []
+        pos = 0
+        expression = expression.strip()
+        while pos < len(expression):
+            match = FILTER_TOKEN_PATTERN.match(expression, pos)
+            if not match or match.end() == pos:
+                raise ValueError(f"过滤表达式在第 {pos + 1} 个字符处无法解析")
+            double, single, op, word = match.groups()
+            if op is not None:
+                tokens.append(("op", op))
+            elif word is not None:
+                tokens.append(("word", word))
+            else:
+                tokens.append(("str", double if double is not None else single))
+            pos = match.end()
+        return tokens
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def _next(self, expected: str = None):
+        kind, text = self._peek()
+        if kind is None:
+            raise ValueError("过滤表达式不完整")
+        if expected is not None and text.lower() != expected:
+            raise ValueError(f"过滤表达式中应为 '{expected}'，实际为 '{text}'")
+        self.pos += 1
+        return kind, text
+
+    def _accept_word(self, word: str) -> bool:
+        kind, text = self._peek()
+        if kind == "word" and text.lower() == word:
+            self.pos += 1
+            return True
+        return False
+
+    # 语法分析：or < and < not < 比较，得到 ("or", a, b) / ("cmp", 字段, 运算符, 值) 这样的元组
+    def _parse_or(self):
+        node = self._parse_and()
+        while self._accept_word("or"):
+            node = ("or", node, self._parse_and())
+        return node
+
+    def _parse_and(self):
+        node = self._parse_not()
+        while self._accept_word("and"):
+            node = ("and", node, self._parse_not())
+        return node
+
+    def _parse_not(self):
+        if self._accept_word("not"):
+            return ("not", self._parse_not())
+        if self._peek() == ("op", "("):
+            self._next()
+            node = self._parse_or()
+            self._next(")")
+            return node
+        return self._parse_comparison()
+
+    def _parse_comparison(self):
+        kind, field = self._next()
+        field = field.lower()
+        if kind != "word" or field not in FILTER_FIELDS:
+            raise ValueError(f"未知的字段: {field}（可用: {', '.join(FILTER_FIELDS)}）")
+        if self._accept_word("not"):
+            self._next("in")
+            return ("not", ("in", field, self._parse_values()))
+        if self._accept_word("in"):
+            return ("in", field, self._parse_values())
+        kind, op = self._next()
+        if kind == "word" and op.lower() == "contains":
+            op = "~"
+        elif kind != "op" or (op not in FILTER_OPERATORS and op != "~"):
+            raise ValueError(f"字段 {field} 后应为比较运算符，实际为 '{op}'")
+        if op == "~" and field not in FILTER_TEXT_FIELDS:
+            raise ValueError(f"~ 只能用于文本字段（{', '.join(FILTER_TEXT_FIELDS)}），不能用于 {field}")
+        return ("cmp", field, op, self._parse_value(field, self._next()))
+
+    def _parse_values(self):
+        self._next("(")
+        values = [self._next()]
+        while self._peek() == ("op", ","):
+            self._next()
+            values.append(self._next())
+        self._next(")")
+        return values
+
+    # 值的规范化：按字段把记号转换成可以直接与任务字段比较的值
+    def _parse_date(self, text: str) -> str:
+        match = re.fullmatch(r'today(?:([+-])(\d+)([dw]?))?', text.lower())
+        if match:
+            days = 0
+            if match.group(1):
+                days = int(match.group(2)) * (7 if match.group(3) == 'w' else 1)
+                days = -days if match.group(1) == '-' else days
+            return (self.today + timedelta(days=days)).isoformat()
+        try:
+            if len(text) == 10:
+                return date.fromisoformat(text).isoformat()
+            return datetime.fromisoformat(text).strftime("%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            raise ValueError(f"无效的日期: {text}")
+
+    def _parse_value(self, field: str, token):
+        kind, text = token
+        if kind == "word" and text.lower() in ("null", "none"):
+            return None
+        if field == "id":
+            try:
+                return int(text)
+            except ValueError:
+                raise ValueError(f"无效的任务ID: {text}")
+        if field == "priority" and text not in PRIORITIES:
+            raise ValueError(f"无效的优先级: {text}")
+        if field == "status" and text not in STATUSES:
+            raise ValueError(f"无效的状态: {text}")
+        if field in ("created_at", "due_date", "completed_at"):
+            value = self._parse_date(text)
+            if field == "due_date" and len(value) != 10:
+                raise ValueError(f"截止日期只能与日期比较: {text}")
+            return value
+        return text
+
+    # 编译：把语法树转换成闭包，之后对每个任务只执行闭包，不再解析
+    def _compile(self, node):
+        kind = node[0]
+        if kind in ("and", "or"):
+            left, right = self._compile(node[1]), self._compile(node[2])
+            if kind == "and":
+                return lambda task: left(task) and right(task)
+            return lambda task: left(task) or right(task)
+        if kind == "not":
+            inner = self._compile(node[1])
+            return lambda task: not inner(task)
+        if kind == "in":
+            field = node[1]
+            values = {self._parse_value(field, token) for token in node[2]}
+            return lambda task: task[field] in values
+
+        _, field, op, value = node
+        if op == "~":
+            if value is None:
+                raise ValueError("~ 不能与 null 比较")
+            needle = value.lower()
+            return lambda task: needle in (task[field] or "").lower()
+        compare = FILTER_OPERATORS[op]
+        if value is None:
+            if compare not in (operator.eq, operator.ne):
+                raise ValueError("null 只能用 = 或 != 比较")
+            return lambda task: compare(task[field], None)
+        if field in ("created_at", "completed_at") and len(value) == 10:
+            # 与日期比较时只比较日期部分
+            return lambda task: task[field] is not None and compare(task[field][:10], value)
+        if compare in (operator.eq, operator.ne):
+            return lambda task: compare(task[field], value)
+        return lambda task: task[field] is not None and compare(task[field], value)
+
+    # 查询计划：只从顶层 and 连接的条件中提取，这些条件对每个结果都必然成立
+    def _plan(self, node):
+        if node[0] == "and":
+            self._plan(node[1])
+            self._plan(node[2])
+            return
+        if node[0] == "in" and node[1] in ("status", "priority"):
+            self._narrow(node[1], {self._parse_value(node[1], token) for token in node[2]})
+        elif node[0] == "cmp":
+            _, field, op, value = node
+            if field in ("status", "priority") and op in ("=", "=="):
+                self._narrow(field, {value})
+            elif field == "due_date" and value is not None and op in ("=", "==", "<=", "<"):
+                until = date.fromisoformat(value)
+                if op == "<":
+                    until -= timedelta(days=1)
+                if self.due_until is None or until.isoformat() < self.due_until:
+                    self.due_until = until.isoformat()
+
+    def _narrow(self, field: str, values: set):
+        attr = "statuses" if field == "status" else "priorities"
+        current = getattr(self, attr)
+        setattr(self, attr, values if current is None else current & values)
+
+
+def compile_filter(expression: str) -> TaskFilter:
+    """编译过滤表达式（同一天内相同的表达式只编译一次）
+
+    today±N 在编译时换算成具体日期，所以缓存键包含当天的日期，
+    常驻的守护进程或提醒服务跨过零点后会重新编译。
+    """
+    return _compile_filter(expression, date.today())
+
+
+@functools.lru_cache(maxsize=128)
+def _compile_filter(expression: str, today: date) -> TaskFilter:
+    return TaskFilter(expression, today)
+
+
+def combine_filter(where: str = None, status: str = None, priority: str = None) -> TaskFilter:
+    """把 --where 表达式与 --status / --priority 合并成一个过滤器"""
+    parts = [f"({where})"] if where else []
+    if status:
+        parts.append(f"status = {status}")
+    if priority:
+        parts.append(f"priority = {priority}")
+    return compile_filter(" and ".join(parts))
+
+
 class TaskManager:
-    """任务管理器"""
+    """任务管理器
+
+    storage 为 "json" 时每次修改都重写整个文件；为 "journal" 时修改只追加到
+    日志文件（<filename>.journal），文件本身作为快照，由后台线程定期压缩。
+
+    任务保存在列式的 TaskStore 中，按ID查找和删除都是O(1)；删除只留下墓碑，
+    列表和导出始终按ID排序。list_tasks 等方法返回 TaskList，
+    只有在输出时才把任务组装成字典。next_id 单调递增并随数据一起保存，删除任务后ID也不会被重复分配。
+
+    _by_status / _by_priority 是按状态、优先级分组的ID集合（用dict保持插入顺序），
+    每次修改时增量维护，过滤只需遍历结果集，统计只需读取各集合的大小。
+
+    _due_heap 是待完成任务按截止日期排列的小顶堆，元素为 (截止日期序数, ID)。
+    完成或删除任务时不从堆中移除（O(1)），查询时顺带丢弃这些失效元素；
+    失效元素超过一半时重建堆。
+
+    _search_index 是标题和描述的倒排索引，第一次搜索时才建立，之后随修改增量维护。
+
+    snapshot() 返回某一时刻的只读视图（TaskSnapshot），导出在快照上进行，
+    期间其他线程可以继续修改任务。
+
+    archive_completed 把完成时间早于阈值的任务移入 TaskArchive（<filename>.archive），
+    它们不再参与列表、统计和保存；统计和导出传入 include_archive=True 时才读取归档。
+
+    add_listener 注册的监听器会收到每条生效的修改记录（包括从其他进程合并来的），
+    整体重新加载时收到 {"op": "reload"}；提醒服务（ReminderService）就建立在这之上。
 
-    def __init__(self, filename="tasks.json"):
+    调用 enable_autosave 后（仅 "json" 存储），提交时不再立即重写文件，而是交给
+    AutoSaver 在后台合并保存。有未保存的修改期间本进程一直持有锁文件（_lease），
+    其他进程最多等待一个防抖间隔，不会读到过期的文件或覆盖这些修改。
+
+    多个进程可以同时读写同一个任务文件。锁文件（<filename>.lock）保存
+    "版本号 快照代数"：每次提交版本号加一，快照文件被替换或日志被轮换时代数加一。
+    加载和修改内存数据都不加锁：日志存储提交时在锁内追加记录；需要重写整个文件的存储
+    在锁外写出临时文件，锁内只比较版本号并替换文件，发现其他进程写入过就重新加载后重试
+    （乐观并发控制，见 _commit）。
+    """
+
+    def __init__(self, filename="tasks.json", storage="json"):
         self.filename = filename
-        self.tasks = []
+        self.storage = storage
+        self.lock_filename = filename + ".lock"
+        self._store = TaskStore()
+        self._by_status = {}
+        self._by_priority = {}
+        self._due_heap = []
+        self._due_stale = 0
+        self._search_index = None
+        self.next_id = 1
+        self.version = 0
+        self.epoch = 0
+        self._thread_lock = threading.Lock()
+        self._lease = None
+        # 持有 _lease 期间提交的修改数，flush 据此判断写文件期间是否又有新的修改
+        self._lease_changes = 0
+        self._listeners = []
+        self.autosave = None
+        self.journal = None
+        self.archive = TaskArchive(filename + ".archive")
+        if storage == "journal":
+            self.journal = TaskJournal(filename + ".journal")
         self.load_tasks()
 
+    @contextlib.contextmanager
+    def _lock(self):
+        """持有任务文件的排他锁（跨进程用fcntl，进程内用线程锁）
+
+        自动保存还有未写出的修改时锁已经在 _lease 中持有，直接复用。
+        """
+        with self._thread_lock:
+            if self._lease is not None:
+                yield self._lease
+                return
+            fd = os.open(self.lock_filename, os.O_RDWR | os.O_CREAT)
+            f = os.fdopen(fd, 'r+')
+            try:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                yield f
+            finally:
+                if self._lease is not f:
+                    f.close()
+
+    @staticmethod
+    def _read_locked_state(f):
+        """从已打开的锁文件读取 (版本号, 快照代数)"""
+        f.seek(0)
+        fields = f.read().split()
+        if len(fields) != 2:
+            return 0, 0
+        return int(fields[0]), int(fields[1])
+
+    @staticmethod
+    def _write_locked_state(f, version: int, epoch: int):
+        """把 (版本号, 快照代数) 写入已加锁的锁文件"""
+        f.seek(0)
+        f.truncate()
+        f.write(f"{version} {epoch}\n")
+        f.flush()
+
+    def _read_state(self):
+        """在共享锁下读取 (版本号, 快照代数)"""
+        if not os.path.exists(self.lock_filename):
+            return 0, 0
+        with open(self.lock_filename, 'r') as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_SH)
+            return self._read_locked_state(f)
+
     def load_tasks(self):
-        """加载任务"""
+        """加载任务
+
+        加载过程不持有锁：前后各读一次快照代数，期间快照被替换就重新加载。
+        """
+        while True:
+            version, epoch = self._read_state()
+            self._load_files()
+            if self._read_state()[1] == epoch:
+                break
+        self.version, self.epoch = version, epoch
+
+    def _load_files(self):
+        """读取快照和日志，重建内存中的数据"""
+        data = []
         if os.path.exists(self.filename):
             try:
                 with open(self.filename, 'r', encoding='utf-8') as f:
-                    self.tasks = json.load(f)
+                    data = json.load(f)
             except (json.JSONDecodeError, FileNotFoundError):
-                self.tasks = []
+                data = []
+
+        # 兼容旧格式：文件内容直接是任务列表
+        if isinstance(data, list):
+            data = {"next_id": 1, "tasks": data}
+        self._load_snapshot(data)
+
+        if self.journal:
+            self.journal.count = 0
+            for record in self.journal.read_records():
+                self._apply(record, replay=True)
+                self.journal.count += 1
+
+    def _load_snapshot(self, data: Dict[str, Any]):
+        """用快照数据重建内存中的任务列表和索引"""
+        self._store = TaskStore()
+        self._by_status = {}
+        self._by_priority = {}
+        self._due_heap = []
+        self._due_stale = 0
+        self._search_index = None
+        self.next_id = data["next_id"]
+        self._insert_tasks(data["tasks"])
+
+    def _insert_tasks(self, tasks):
+        """把一批已保存的任务加入内存存储和各个索引"""
+        invalid = len(self._store._raw_due)
+        duplicates = []
+        for task in tasks:
+            if task["id"] in self._store:
+                # 旧版本用 len(tasks)+1 分配ID，删除任务后可能写出重复的ID
+                duplicates.append(task)
+            else:
+                self._insert_task(task)
+        if duplicates:
+            # 所有ID都读入后再按顺序分配新ID，每次加载的结果相同
+            new_ids = []
+            for task in duplicates:
+                new_ids.append(self.next_id)
+                self._insert_task(dict(task, id=self.next_id))
+            print(f"警告: {self.filename} 中有 {len(duplicates)} 个任务的ID重复"
+                  f"（{', '.join(str(task['id']) for task in duplicates)}），"
+                  f"已依次改为新的ID {', '.join(map(str, new_ids))}", file=sys.stderr)
+        heapq.heapify(self._due_heap)
+        invalid = len(self._store._raw_due) - invalid
+        if invalid:
+            print(f"警告: {self.filename} 中有 {invalid} 个任务的截止日期无法解析，"
+                  f"已原样保留，这些任务不参与到期查询", file=sys.stderr)
+
+    def _insert_task(self, task: Dict[str, Any]):
+        self._store.append(task)
+        self._index_task(task["id"], task["status"], task["priority"])
+        # 无法解析的旧截止日期记为 MISSING，不参与到期查询
+        due = self._store.due_ordinal(task["id"])
+        if task["status"] == "pending" and due != TaskStore.MISSING:
+            self._due_heap.append((due, task["id"]))
+        if self._search_index is not None:
+            self._search_index.add(task["id"], task["title"], task["description"])
+        self.next_id = max(self.next_id, task["id"] + 1)
+
+    @property
+    def tasks(self):
+        """所有任务"""
+        return TaskList(self._store, list(self._store.iter_ids()))
+
+    def _catch_up(self, version: int, epoch: int):
+        """合并其他进程写入的修改（调用者必须持有锁）"""
+        if version == self.version:
+            return
+        if self.journal and epoch == self.epoch:
+            # 只有新追加的日志，读取增量即可
+            for record in self.journal.read_new_records():
+                if self._apply(record, replay=True):
+                    self._notify(record)
+                self.journal.count += 1
+        else:
+            self._load_files()
+            self._notify({"op": "reload"})
+        self.version, self.epoch = version, epoch
+
+    def refresh(self):
+        """合并其他进程写入的修改（常驻内存时在处理请求前调用）
+
+        日志存储在锁内增量读取新记录；其他存储需要整体重新加载，在锁外进行。
+        """
+        if self.journal or self._lease is not None:
+            with self._lock() as f:
+                self._catch_up(*self._read_locked_state(f))
+        elif self._read_state() != (self.version, self.epoch):
+            self._reload()
+
+    def _reload(self):
+        """不持有锁重新加载全部数据（见 load_tasks）"""
+        self.load_tasks()
+        self._notify({"op": "reload"})
 
     def save_tasks(self):
-        """保存任务"""
-        with open(self.filename, 'w', encoding='utf-8') as f:
-            json.dump(self.tasks, f, ensure_ascii=False, indent=2)
+        """保存任务（先写临时文件再替换，其他进程不会读到写了一半的文件）"""
+        self._install_snapshot(self._stage_snapshot())
+
+    # 保存分两步：_stage_snapshot 把数据写入临时文件，不需要持有锁；
+    # _install_snapshot 用 os.replace 换上新文件，只需在锁内执行
+    def _stage_snapshot(self):
+        return self._dump_snapshot(self.next_id, self._store)
+
+    def _capture_snapshot(self):
+        """记下要保存的数据（调用者持有线程锁），返回在线程锁外写出临时文件的函数"""
+        next_id, store = self.next_id, self._store.snapshot()
+        return lambda: self._dump_snapshot(next_id, store)
+
+    def _install_snapshot(self, staged):
+        os.replace(staged, self.filename)
+
+    def _discard_snapshot(self, staged):
+        os.remove(staged)
+
+    def _dump_snapshot(self, next_id: int, store: TaskStore) -> str:
+        """把快照逐行写入临时文件（每个任务一行）并返回临时文件名"""
+        tmp_filename = f"{self.filename}.{os.getpid()}.tmp"
+        self._write_snapshot_file(tmp_filename, next_id, store.iter_rows())
+        return tmp_filename
+
+    @staticmethod
+    def _write_snapshot_file(filename: str, next_id: int, tasks):
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(f'{{"next_id": {next_id}, "tasks": [')
+            for i, task in enumerate(tasks):
+                f.write(",\n" if i else "\n")
+                f.write(json.dumps(task, ensure_ascii=False))
+            f.write("\n]}\n")
+
+    def _index_task(self, task_id: int, status: str, priority: str):
+        """把任务加入状态和优先级索引"""
+        self._by_status.setdefault(status, {})[task_id] = None
+        self._by_priority.setdefault(priority, {})[task_id] = None
+
+    def _unindex_task(self, task_id: int):
+        """把任务从状态和优先级索引中移除"""
+        del self._by_status[self._store.status(task_id)][task_id]
+        del self._by_priority[self._store.priority(task_id)][task_id]
+
+    def _untrack_due(self, task_id: int):
+        """待完成任务即将被完成或删除：它在截止日期堆中的元素失效"""
+        if self._store.status(task_id) == "pending" and \
+                self._store.due_ordinal(task_id) != TaskStore.MISSING:
+            self._due_stale += 1
+
+    def _apply(self, record: Dict[str, Any], replay: bool = False) -> bool:
+        """把一条修改记录应用到内存中的任务列表（重放时必须幂等）"""
+        op = record["op"]
+        if op == "add":
+            task = record["task"]
+            # 压缩中途崩溃时，.old 里的记录可能已经包含在快照中
+            if replay and task["id"] in self._store:
+                return False
+            self._store.append(task)
+            self._index_task(task["id"], task["status"], task["priority"])
+            due = self._store.due_ordinal(task["id"])
+            if task["status"] == "pending" and due != TaskStore.MISSING:
+                heapq.heappush(self._due_heap, (due, task["id"]))
+            if self._search_index is not None:
+                self._search_index.add(task["id"], task["title"], task["description"])
+            self.next_id = max(self.next_id, task["id"] + 1)
+            return True
+
+        task_id = record["id"]
+        if task_id not in self._store:
+            return False
+        self._untrack_due(task_id)
+
+        if op == "complete":
+            self._unindex_task(task_id)
+            self._store.complete(task_id, record["completed_at"])
+            self._index_task(task_id, "completed", self._store.priority(task_id))
+            return True
+
+        # 归档对内存数据而言就是删除，任务内容在提交时已写入归档
+        if op in ("delete", "archive"):
+            self._unindex_task(task_id)
+            if self._search_index is not None:
+                task = self._store.get(task_id)
+                self._search_index.remove(task_id, task["title"], task["description"])
+            self._store.remove(task_id)
+            return True
+
+        raise ValueError(f"未知的日志操作: {op}")
+
+    def _apply_records(self, records: List[Dict[str, Any]]):
+        """应用 records 并分配新任务的ID，返回 (每条记录是否生效, 生效的记录)"""
+        results = []
+        applied = []
+        for record in records:
+            if record["op"] == "add":
+                record["task"]["id"] = self.next_id
+            ok = self._apply(record)
+            results.append(ok)
+            if ok:
+                applied.append(record)
+        return results, applied
+
+    def _archive_applied(self, applied: List[Dict[str, Any]]):
+        """把生效的归档记录写入归档（调用者必须持有锁）"""
+        archived = [record["task"] for record in applied if record["op"] == "archive"]
+        if archived:
+            # 先写入归档再替换热数据，中途崩溃不会丢失任务
+            self.archive.append(archived)
+
+    def _commit(self, records: List[Dict[str, Any]]) -> List[bool]:
+        """应用并持久化 records，返回每条记录是否生效
+
+        新任务的ID在这里分配，版本号检查保证多个进程不会分配到相同的ID。
+        需要重写整个文件的存储采用乐观并发：在锁外重新加载（必要时）、应用修改并写出
+        临时文件，然后在锁内只比较版本号并替换文件；期间有其他进程提交过就丢弃临时文件，
+        重新加载后重试。日志存储和开启了自动保存时在锁内提交，临界区本身就很短。
+        """
+        if self.journal or self.autosave:
+            return self._commit_locked(records)
+
+        while True:
+            state = self._read_state()
+            if state != (self.version, self.epoch):
+                self._reload()
+                continue
+            results, applied = self._apply_records(records)
+            if not applied:
+                return results
+            staged = self._stage_snapshot()
+            with self._lock() as f:
+                if self._read_locked_state(f) == state:
+                    self._archive_applied(applied)
+                    self._install_snapshot(staged)
+                    self.version += 1
+                    self.epoch += 1
+                    self._write_locked_state(f, self.version, self.epoch)
+                    for record in applied:
+                        self._notify(record)
+                    return results
+            # 其他进程抢先提交：内存中的修改作废，重新加载后再应用一次
+            self._discard_snapshot(staged)
+            self._reload()
+
+    def _commit_locked(self, records: List[Dict[str, Any]]) -> List[bool]:
+        """在锁内合并其他进程的修改，然后应用并持久化 records"""
+        with self._lock() as f:
+            self._catch_up(*self._read_locked_state(f))
+
+            results, applied = self._apply_records(records)
+            self._archive_applied(applied)
+            for record in applied:
+                self._notify(record)
+
+            if applied and self.autosave and not self.journal:
+                # 保留锁直到后台保存完成，版本号也等写出文件后再更新
+                self._lease = f
+                self._lease_changes += len(applied)
+                _LEASED_MANAGERS.add(self)
+                self.autosave.mark_dirty(len(applied))
+            elif applied:
+                self._persist(applied)
+                self.version += 1
+                if not self.journal:
+                    self.epoch += 1
+                self._write_locked_state(f, self.version, self.epoch)
+                if self.journal and self.journal.should_compact():
+                    self._start_compaction(f)
+        return results
+
+    def add_listener(self, callback):
+        """注册修改监听器（callback 在持有锁时被调用，只应做轻量的工作）"""
+        self._listeners.append(callback)
+
+    def _notify(self, record: Dict[str, Any]):
+        for callback in self._listeners:
+            callback(record)
+
+    def _persist(self, records: List[Dict[str, Any]]):
+        """持久化修改（调用者必须持有锁）"""
+        if self.journal:
+            self.journal.append(records)
+        else:
+            self.save_tasks()
+
+    def _start_compaction(self, f):
+        """轮换日志并在后台写出快照（调用者必须持有锁）"""
+        if not self.journal.begin_compaction():
+            return
+        # 日志已轮换，其他进程不能再按偏移量增量读取
+        self.epoch += 1
+        self._write_locked_state(f, self.version, self.epoch)
+        next_id = self.next_id
+        store = self._store.snapshot()
+
+        def write_snapshot():
+            tmp_filename = self._dump_snapshot(next_id, store)
+            with self._lock() as lock_file:
+                version, epoch = self._read_locked_state(lock_file)
+                os.replace(tmp_filename, self.filename)
+                self.journal.finish_compaction()
+                # 内存数据已是最新时同步更新版本号，避免下次提交时无谓地重新加载
+                if (version, epoch) == (self.version, self.epoch):
+                    self.version, self.epoch = version + 1, epoch + 1
+                self._write_locked_state(lock_file, version + 1, epoch + 1)
+
+        self.journal.start_compaction(write_snapshot)
+
+    def compact(self):
+        """立即压缩日志并等待完成"""
+        if self.journal:
+            self.journal.wait()
+            with self._lock() as f:
+                self._catch_up(*self._read_locked_state(f))
+                self._start_compaction(f)
+            self.journal.wait()
+
+    def enable_autosave(self, interval: float = 1.0, max_pending: int = 100):
+        """开启防抖的后台自动保存（日志存储本身只追加，不需要）"""
+        if not self.journal and self.autosave is None:
+            self.autosave = AutoSaver(self.flush, interval, max_pending)
+
+    def flush(self):
+        """立即写出自动保存尚未保存的修改并释放锁
+
+        线程锁只在记下快照和替换文件时持有，写临时文件期间前台照常提交修改
+        （仍在 _lease 的保护下，其他进程读写不了）。写文件期间又有新的修改时
+        保留 _lease，由下一次保存写出。
+        """
+        with self._thread_lock:
+            if self._lease is None:
+                return
+            changes = self._lease_changes
+            write_snapshot = self._capture_snapshot()
+        try:
+            staged = write_snapshot()
+        except BaseException:
+            with self._thread_lock:
+                self._release_lease()
+            raise
+
+        with self._thread_lock:
+            try:
+                self._install_snapshot(staged)
+                self.version += 1
+                self.epoch += 1
+                self._write_locked_state(self._lease, self.version, self.epoch)
+            except BaseException:
+                self._release_lease()
+                raise
+            if self._lease_changes == changes:
+                self._release_lease()
+
+    def _release_lease(self):
+        """释放自动保存持有的锁（调用者必须持有线程锁）"""
+        lease, self._lease = self._lease, None
+        self._lease_changes = 0
+        _LEASED_MANAGERS.discard(self)
+        lease.close()
+
+    def close(self):
+        """写出未保存的修改并等待后台任务结束"""
+        if self.autosave:
+            self.autosave.close()
+            self.autosave = None
+        # 写文件期间其他线程又提交了修改时 flush 保留着锁，需要再写一次
+        while self._lease is not None:
+            self.flush()
+        if self.journal:
+            self.journal.wait()
 
     def add_task(self, title: str, priority: str = "medium",
                  due_date: str = None, description: str = ""):
-        """添加任务"""
+        """添加任务（优先级或截止日期无效时抛出 ValueError）"""
+        fields = validate_tasks([(title, priority, due_date, description)])[0]
         task = {
-            "id": len(self.tasks) + 1,
-            "title": title,
-            "priority": priority,
+            "id": None,  # 提交时分配
+            "title": fields["title"],
+            "priority": fields["priority"],
             "status": "pending",
             "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "due_date": due_date,
-            "description": description,
+            "due_date": fields["due_date"],
+            "description": fields["description"],
             "completed_at": None
         }
-        self.tasks.append(task)
+        self._commit([{"op": "add", "task": task}])
+        return task["id"]
+
+    def complete_task(self, task_id: int):
+        """完成任务"""
+        record = {
+            "op": "complete",
+            "id": task_id,
+            "completed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+        return self._commit([record])[0]
+
+    def delete_task(self, task_id: int):
+        """删除任务"""
+        return self._commit([{"op": "delete", "id": task_id}])[0]
+
+    def add_tasks(self, items) -> List[int]:
+        """批量添加任务
+
+        items 中每一项可以是包含 title/priority/due_date/description 的字典，
+        也可以是与 add_task 参数顺序相同的元组。先校验整批数据，任何一项
+        不合法都会抛出 ValueError 且不做任何修改；整批只提交、持久化一次。
+        """
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        records = []
+        for fields in validate_tasks(items):
+            task = {
+                "id": None,
+                "title": fields["title"],
+                "priority": fields["priority"],
+                "status": "pending",
+                "created_at": now,
+                "due_date": fields["due_date"],
+                "description": fields["description"],
+                "completed_at": None
+            }
+            records.append({"op": "add", "task": task})
+
+        if records:
+            self._commit(records)
+        return [record["task"]["id"] for record in records]
+
+    def get_task(self, task_id: int):
+        """按ID获取任务，不存在时返回None"""
+        return self._store.get(task_id)
+
+    def archive_completed(self, older_than_days: int = 30) -> int:
+        """把完成时间早于 older_than_days 天前的任务移入归档，返回归档的任务数"""
+        cutoff = (datetime.now() - timedelta(days=older_than_days)).strftime("%Y-%m-%d %H:%M:%S")
+        records = [{"op": "archive", "id": task["id"], "task": task}
+                   for task in self.list_tasks(status="completed")
+                   if task["completed_at"] and task["completed_at"] < cutoff]
+        if not records:
+            return 0
+        return sum(self._commit(records))
+
+    def list_tasks(self, status: str = None, priority: str = None, where: str = None,
+                   offset: int = 0, limit: int = None):
+        """列出任务（where 为过滤表达式，见 TaskFilter；offset/limit 只取其中一段）"""
+        tasks = self._list_tasks(status, priority, where)
+        if offset or limit is not None:
+            tasks = tasks[offset:None if limit is None else offset + limit]
+        return tasks
+
+    def _list_tasks(self, status: str = None, priority: str = None, where: str = None):
+        if where:
+            task_filter = combine_filter(where, status, priority)
+            store = self._store
+            ids = [task_id for task_id in self._filter_candidates(task_filter)
+                   if task_filter.predicate(store.get(task_id))]
+            # 截止日期堆、状态和优先级索引中的ID不按顺序排列
+            return TaskList(store, sorted(ids))
+
+        if status and priority:
+            # 遍历较小的集合，在较大的集合中检查成员
+            status_ids = self._by_status.get(status, {})
+            priority_ids = self._by_priority.get(priority, {})
+            if len(status_ids) > len(priority_ids):
+                status_ids, priority_ids = priority_ids, status_ids
+            ids = [task_id for task_id in status_ids if task_id in priority_ids]
+        elif status:
+            ids = list(self._by_status.get(status, {}))
+        elif priority:
+            ids = list(self._by_priority.get(priority, {}))
+        else:
+            return self.tasks
+
+        # 索引按加入的先后排列（例如完成的先后），输出前按ID排序
+        ids.sort()
+        return TaskList(self._store, ids)
+
+    def _filter_candidates(self, task_filter: TaskFilter):
+        """用索引挑出可能满足过滤条件的任务ID，结果还需逐个检查 predicate
+
+        只查待完成任务且限定了截止日期上限时用截止日期堆，否则用状态和优先级索引，
+        都用不上时遍历全部任务。
+        """
+        if task_filter.statuses == {"pending"} and task_filter.due_until:
+            return self._peek_due(date.fromisoformat(task_filter.due_until).toordinal())
+
+        groups = []
+        if task_filter.statuses is not None:
+            groups.append([self._by_status.get(status, {}) for status in task_filter.statuses])
+        if task_filter.priorities is not None:
+            groups.append([self._by_priority.get(priority, {}) for priority in task_filter.priorities])
+        if not groups:
+            return self._store.iter_ids()
+
+        # 遍历最小的一组集合，在其他组中检查成员
+        groups.sort(key=lambda sets: sum(map(len, sets)))
+        smallest, others = groups[0], groups[1:]
+        return [task_id for ids in smallest for task_id in ids
+                if all(any(task_id in ids for ids in sets) for sets in others)]
+
+    def due_tasks(self, within_days: int = 7, limit: int = None):
+        """截止日期在今天之后 within_days 天以内（含已过期）的待完成任务，按截止日期排序"""
+        ids = self._peek_due(date.today().toordinal() + within_days, limit)
+        return TaskList(self._store, ids)
+
+    def overdue_tasks(self, limit: int = None):
+        """已过截止日期的待完成任务，按截止日期排序"""
+        ids = self._peek_due(date.today().toordinal() - 1, limit)
+        return TaskList(self._store, ids)
+
+    def _peek_due(self, until: int, limit: int = None) -> List[int]:
+        """从截止日期堆中取出截止日期不晚于 until 的前 limit 个任务ID
+
+        依次弹出堆顶，有效的元素最后放回堆中，失效的直接丢弃，
+        因此代价是 O(k log n)（k 为结果数加上顺带清理的失效元素数）。
+        """
+        if self._due_stale > len(self._due_heap) // 2:
+            self._rebuild_due_heap()
+
+        heap = self._due_heap
+        found = []
+        while heap and (limit is None or len(found) < limit):
+            due, task_id = heap[0]
+            if task_id not in self._store or self._store.status(task_id) != "pending":
+                heapq.heappop(heap)
+                self._due_stale -= 1
+                continue
+            if due > until:
+                break
+            found.append(heapq.heappop(heap))
+
+        for item in found:
+            heapq.heappush(heap, item)
+        return [task_id for _, task_id in found]
+
+    def _rebuild_due_heap(self):
+        """丢弃所有失效元素，重建截止日期堆"""
+        self._due_heap = [(due, task_id) for due, task_id in self._due_heap
+                          if task_id in self._store and self._store.status(task_id) == "pending"]
+        heapq.heapify(self._due_heap)
+        self._due_stale = 0
+
+    def search(self, query: str, limit: int = None):
+        """全文搜索标题和描述
+
+        空格分隔的词必须同时出现，用 OR 连接多组条件，结果按相关度排序。
+        """
+        if self._search_index is None:
+            index = SearchIndex()
+            store = self._store
+            for pos in store.positions():
+                index.add(store.ids[pos], store.titles[pos], store.descriptions[pos])
+            self._search_index = index
+        return TaskList(self._store, self._search_index.search(query, limit))
+
+    def snapshot(self) -> TaskSnapshot:
+        """合并其他进程的修改，然后创建当前数据的只读快照"""
+        # 需要整体重新加载时先在锁外完成，锁内通常只剩检查版本号
+        self.refresh()
+        with self._lock() as f:
+            self._catch_up(*self._read_locked_state(f))
+            self._prepare_snapshot()
+            return TaskSnapshot(self._store.snapshot(), self._task_stats(), self.version)
+
+    def _prepare_snapshot(self):
+        """创建快照前把按需加载的数据读入内存（调用者必须持有锁）"""
+
+    def get_task_stats(self, include_archive: bool = False):
+        """获取任务统计（include_archive 为真时把归档的已完成任务也计算在内）"""
+        stats = self._task_stats()
+        if include_archive:
+            archived = self.archive.stats()
+            stats["completed"] += archived["count"]
+            stats["total"] += archived["count"]
+            for pri, count in archived["priorities"].items():
+                if count:
+                    stats["priorities"][pri] = stats["priorities"].get(pri, 0) + count
+            stats["completion_rate"] = stats["completed"] / stats["total"] * 100 if stats["total"] else 0
+        return stats
+
+    def _task_stats(self):
+        """统计未归档的任务"""
+        total = len(self._store)
+        completed = len(self._by_status.get("completed", {}))
+        pending = total - completed
+
+        priorities = {pri: len(ids) for pri, ids in self._by_priority.items() if ids}
+
+        return {
+            "total": total,
+            "completed": completed,
+            "pending": pending,
+            "completion_rate": (completed / total * 100) if total > 0 else 0,
+            "priorities": priorities
+        }
+
+    def export_to_csv(self, filename: str, include_archive: bool = False):
+        """导出到CSV"""
+        return self.export_tasks(filename, "csv", include_archive=include_archive)
+
+    def export_to_json(self, filename: str, include_archive: bool = False):
+        """导出到JSON"""
+        return self.export_tasks(filename, "json", include_archive=include_archive)
+
+    def export_tasks(self, filename: str, fmt: str = None, status: str = None,
+                     priority: str = None, since: str = None, until: str = None,
+                     include_archive: bool = False, compress: bool = None,
+                     snapshot: TaskSnapshot = None) -> int:
+        """流式导出任务，返回导出的任务数
+
+        fmt 为 csv/json/ndjson，默认按扩展名判断；文件名以 .gz 结尾或 compress 为真时
+        用gzip压缩。status、priority 过滤状态和优先级，since、until（YYYY-MM-DD，含两端）
+        过滤创建日期。任务逐个经过大缓冲区写出，内存占用与任务数无关。
+        导出读取的是开始时的快照（也可以传入已创建的 snapshot，导出后会被关闭），
+        期间其他线程的修改不会混入，也不会被阻塞。
+        """
+        fmt = fmt or detect_task_format(filename)
+        if compress is None:
+            compress = filename.endswith(".gz")
+
+        count = 0
+        snapshot = snapshot or self.snapshot()
+        with contextlib.closing(snapshot), open_export_file(filename, compress) as f:
+            if fmt == "csv":
+                writer = csv.writer(f)
+                writer.writerow(["ID", "标题", "优先级", "状态", "创建时间", "截止日期", "描述", "完成时间"])
+            elif fmt == "json":
+                f.write("[")
+
+            for task in self._iter_export_tasks(snapshot, include_archive):
+                if status and task["status"] != status:
+                    continue
+                if priority and task["priority"] != priority:
+                    continue
+                if since and task["created_at"][:10] < since:
+                    continue
+                if until and task["created_at"][:10] > until:
+                    continue
+
+                if fmt == "csv":
+                    writer.writerow([
+                        task["id"],
+                        task["title"],
+                        task["priority"],
+                        task["status"],
+                        task["created_at"],
+                        task["due_date"] or "",
+                        task["description"] or "",
+                        task["completed_at"] or ""
+                    ])
+                elif fmt == "json":
+                    f.write(",\n" if count else "\n")
+                    f.write(json.dumps(task, ensure_ascii=False))
+                else:
+                    f.write(json.dumps(task, ensure_ascii=False))
+                    f.write("\n")
+                count += 1
+
+            if fmt == "json":
+                f.write("\n]\n")
+        return count
+
+    def _iter_export_tasks(self, snapshot, include_archive: bool = False):
+        """遍历快照中的任务，需要时接着遍历归档
+
+        为了去重会记住热数据的ID，归档之后热数据只占很小一部分。
+        """
+        exported = set()
+        for task in snapshot.iter_tasks():
+            exported.add(task["id"])
+            yield task
+        if include_archive:
+            for task in self.archive.iter_tasks():
+                # 归档后、删除热数据前崩溃的任务会同时出现在两处
+                if task["id"] not in exported:
+                    yield task
+
+    def iter_tasks(self):
+        """遍历所有任务"""
+        return self._store.iter_rows()
+
+
+class SQLiteTaskManager(TaskManager):
+    """基于SQLite的任务管理器
+
+    任务保存在 sqlite3 数据库中，status、priority、due_date 上建有索引，
+    过滤和统计都交给SQL执行，不需要把所有任务读入内存。
+
+    tasks_fts 是标题和描述的 FTS5 全文索引，保存的是 tokenize() 切分后用空格连接的词，
+    与内存中的 SearchIndex 分词一致；插入任务时在同一事务中写入，删除（包括归档）由
+    触发器同步（标题和描述创建后不会修改）。SQLite 编译时没有启用 FTS5 时，
+    搜索退回逐行 LIKE 子串匹配，不排序。
+    """
+
+    COLUMNS = ["id", "title", "priority", "status", "created_at",
+               "due_date", "description", "completed_at"]
+
+    def __init__(self, filename="tasks.db"):
+        # 守护进程在多个线程中处理请求（由它串行化对连接的访问）
+        self.conn = sqlite3.connect(filename, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        # 基类初始化共用的状态（监听器、归档、自动保存等），并调用 load_tasks 建表
+        super().__init__(filename, storage="sqlite")
+
+    def load_tasks(self):
+        """创建表和索引"""
+        # WAL 模式下读事务看到的是开始时的数据，且不阻塞写入（快照依赖这一点）
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # AUTOINCREMENT 保证删除后的ID不会被重新分配
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                priority TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                due_date TEXT,
+                description TEXT,
+                completed_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status, priority);
+            CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks(priority);
+            CREATE INDEX IF NOT EXISTS idx_tasks_due_date ON tasks(due_date);
+        """)
+        self._fts = self._create_search_table()
+        self._data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _create_search_table(self) -> bool:
+        """创建全文索引表（第一次创建时为已有的任务补建索引），返回FTS5是否可用"""
+        exists = "SELECT 1 FROM sqlite_master WHERE name = 'tasks_fts'"
+        if self.conn.execute(exists).fetchone():
+            return True
+        # 多个进程可能同时打开新数据库：在写事务中再检查一次
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            if not self.conn.execute(exists).fetchone():
+                self.conn.execute("CREATE VIRTUAL TABLE tasks_fts USING fts5(title, description)")
+                self.conn.execute("""
+                    CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+                        DELETE FROM tasks_fts WHERE rowid = old.id;
+                    END""")
+                rows = self.conn.execute("SELECT id, title, description FROM tasks").fetchall()
+                self.conn.executemany(
+                    "INSERT INTO tasks_fts (rowid, title, description) VALUES (?, ?, ?)",
+                    (self._search_terms(*row) for row in rows))
+            self.conn.commit()
+        except sqlite3.OperationalError:
+            # no such module: fts5
+            self.conn.rollback()
+            return False
+        return True
+
+    @staticmethod
+    def _search_terms(task_id: int, title: str, description: str):
+        return task_id, " ".join(tokenize(title)), " ".join(tokenize(description or ""))
+
+    def save_tasks(self):
+        """提交事务"""
+        self.conn.commit()
+
+    def refresh(self):
+        """SQLite每次查询都读取最新数据，无需合并；其他连接提交过修改时通知监听器"""
+        # data_version 只在其他连接提交后变化
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._data_version = data_version
+            self._notify({"op": "reload"})
+
+    @property
+    def tasks(self):
+        """所有任务（会读取整张表，只用于兼容）"""
+        return list(self.iter_tasks())
+
+    def add_task(self, title: str, priority: str = "medium",
+                 due_date: str = None, description: str = ""):
+        """添加任务（优先级或截止日期无效时抛出 ValueError）"""
+        f = validate_tasks([(title, priority, due_date, description)])[0]
+        task = self._insert(f, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
         self.save_tasks()
+        self._notify({"op": "add", "task": task})
         return task["id"]
 
+    def add_tasks(self, items) -> List[int]:
+        """批量添加任务（整批在一个事务中插入）"""
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        fields = validate_tasks(items)
+        with self.conn:
+            tasks = [self._insert(f, now) for f in fields]
+        for task in tasks:
+            self._notify({"op": "add", "task": task})
+        return [task["id"] for task in tasks]
+
+    def _insert(self, f: Dict[str, Any], created_at: str) -> Dict[str, Any]:
+        """插入一条已校验的任务（不提交），返回完整的任务"""
+        cursor = self.conn.execute(
+            "INSERT INTO tasks (title, priority, status, created_at, due_date, description) "
+            "VALUES (?, ?, 'pending', ?, ?, ?)",
+            (f["title"], f["priority"], created_at, f["due_date"], f["description"])
+        )
+        if self._fts:
+            self.conn.execute("INSERT INTO tasks_fts (rowid, title, description) VALUES (?, ?, ?)",
+                              self._search_terms(cursor.lastrowid, f["title"], f["description"]))
+        return {"id": cursor.lastrowid, "title": f["title"], "priority": f["priority"],
+                "status": "pending", "created_at": created_at, "due_date": f["due_date"],
+                "description": f["description"], "completed_at": None}
+
     def complete_task(self, task_id: int):
         """完成任务"""
-        for task in self.tasks:
-            if task["id"] == task_id:
-                task["status"] = "completed"
-                task["completed_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                self.save_tasks()
-                return True
-        return False
+        cursor = self.conn.execute(
+            "UPDATE tasks SET status = 'completed', completed_at = ? WHERE id = ?",
+            (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), task_id)
+        )
+        self.save_tasks()
+        if cursor.rowcount > 0:
+            self._notify({"op": "complete", "id": task_id})
+        return cursor.rowcount > 0
 
     def delete_task(self, task_id: int):
         """删除任务"""
-        for i, task in enumerate(self.tasks):
-            if task["id"] == task_id:
-                del self.tasks[i]
-                self.save_tasks()
-                return True
-        return False
+        cursor = self.conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+        self.save_tasks()
+        if cursor.rowcount > 0:
+            self._notify({"op": "delete", "id": task_id})
+        return cursor.rowcount > 0
 
-    def list_tasks(self, status: str = None, priority: str = None):
-        """列出任务"""
-        filtered_tasks = self.tasks
+    def get_task(self, task_id: int):
+        """按ID获取任务，不存在时返回None"""
+        row = self.conn.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return None if row is None else dict(row)
 
-        if status:
-            filtered_tasks = [t for t in filtered_tasks if t["status"] == status]
+    def list_tasks(self, status: str = None, priority: str = None, where: str = None,
+                   offset: int = 0, limit: int = None):
+        """列出任务，返回逐行读取游标的迭代器
 
-        if priority:
-            filtered_tasks = [t for t in filtered_tasks if t["priority"] == priority]
+        where 中能用索引的状态、优先级、截止日期条件交给SQL，其余逐行检查；
+        没有需要逐行检查的条件时 offset/limit 也交给SQL（LIMIT/OFFSET）。
+        """
+        task_filter = combine_filter(where, status, priority) if where else None
+        statuses = {status} if status else None
+        priorities = {priority} if priority else None
+        due_until = None
+        if task_filter:
+            statuses, priorities = task_filter.statuses, task_filter.priorities
+            due_until = task_filter.due_until
+
+        conditions = []
+        params = []
+        for column, values in (("status", statuses), ("priority", priorities)):
+            if values is not None:
+                # "status in (pending, null)" 中的 null 要用 IS NULL 匹配
+                present = sorted(value for value in values if value is not None)
+                terms = [f"{column} IN ({', '.join('?' * len(present))})"] if present else []
+                if None in values:
+                    terms.append(f"{column} IS NULL")
+                conditions.append("(" + " OR ".join(terms) + ")" if terms else "0")
+                params.extend(present)
+        if due_until:
+            conditions.append("due_date <= ?")
+            params.append(due_until)
+
+        sql = "SELECT * FROM tasks"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY id"
+        if not task_filter and (offset or limit is not None):
+            sql += " LIMIT ? OFFSET ?"
+            params += [-1 if limit is None else limit, offset]
+            offset, limit = 0, None
+        rows = (dict(row) for row in self.conn.execute(sql, params))
+        if task_filter:
+            rows = (task for task in rows if task_filter.predicate(task))
+        if offset or limit is not None:
+            rows = itertools.islice(rows, offset, None if limit is None else offset + limit)
+        return rows
+
+    def due_tasks(self, within_days: int = 7, limit: int = None):
+        """截止日期在今天之后 within_days 天以内（含已过期）的待完成任务"""
+        until = date.fromordinal(date.today().toordinal() + within_days).isoformat()
+        return self._query_due(until, limit)
+
+    def overdue_tasks(self, limit: int = None):
+        """已过截止日期的待完成任务"""
+        until = date.fromordinal(date.today().toordinal() - 1).isoformat()
+        return self._query_due(until, limit)
+
+    def search(self, query: str, limit: int = None):
+        """全文搜索标题和描述
+
+        语法与 TaskManager.search 相同；用 FTS5 索引按 bm25 排序（标题的权重是描述的
+        SearchIndex.TITLE_WEIGHT 倍）。
+        """
+        if not self._fts:
+            return self._search_like(query, limit)
+        groups = []
+        for group in re.split(r'\s+OR\s+', query.strip()):
+            tokens = dict.fromkeys(tokenize(group, for_query=True))
+            if tokens:
+                # 词只含字母、数字和中日韩文字，加上引号避免被当成 FTS5 的运算符
+                groups.append("(" + " ".join(f'"{token}"' for token in tokens) + ")")
+        if not groups:
+            return []
+        rows = self.conn.execute(
+            "SELECT tasks.* FROM tasks_fts JOIN tasks ON tasks.id = tasks_fts.rowid "
+            "WHERE tasks_fts MATCH ? ORDER BY bm25(tasks_fts, ?, 1.0), tasks.id LIMIT ?",
+            (" OR ".join(groups), float(SearchIndex.TITLE_WEIGHT), -1 if limit is None else limit))
+        return [dict(row) for row in rows]
+
+    def _search_like(self, query: str, limit: int = None):
+        """没有FTS5时逐行 LIKE 子串匹配（全表扫描，结果按ID排序）"""
+        groups = []
+        params = []
+        for group in re.split(r'\s+OR\s+', query.strip()):
+            terms = group.split()
+            if terms:
+                groups.append("(" + " AND ".join(
+                    "(title LIKE ? ESCAPE '\\' OR description LIKE ? ESCAPE '\\')" for _ in terms) + ")")
+                for term in terms:
+                    # % 和 _ 在 LIKE 中是通配符，按普通字符匹配
+                    pattern = "%" + re.sub(r'([\\%_])', r'\\\1', term) + "%"
+                    params.extend([pattern, pattern])
+        if not groups:
+            return []
+        sql = f"SELECT * FROM tasks WHERE {' OR '.join(groups)} ORDER BY id LIMIT ?"
+        params.append(-1 if limit is None else limit)
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def _query_due(self, until: str, limit: int = None):
+        """按 due_date 索引查询截止日期不晚于 until 的待完成任务"""
+        rows = self.conn.execute(
+            "SELECT * FROM tasks WHERE due_date <= ? AND status = 'pending' "
+            "ORDER BY due_date, id LIMIT ?",
+            (until, -1 if limit is None else limit)
+        )
+        return [dict(row) for row in rows]
 
-        return filtered_tasks
+    def snapshot(self):
+        """在独立连接上开启读事务作为快照"""
+        return SQLiteTaskSnapshot(self.filename)
 
-    def get_task_stats(self):
+    def archive_completed(self, older_than_days: int = 30) -> int:
+        """把完成时间早于 older_than_days 天前的任务移入归档，返回归档的任务数"""
+        cutoff = (datetime.now() - timedelta(days=older_than_days)).strftime("%Y-%m-%d %H:%M:%S")
+        # BEGIN IMMEDIATE 立即取得写锁，其他进程不能同时归档同一批任务
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            tasks = [dict(row) for row in self.conn.execute(
+                "SELECT * FROM tasks WHERE status = 'completed' AND completed_at < ? ORDER BY id",
+                (cutoff,))]
+            if tasks:
+                self.archive.append(tasks)
+                self.conn.executemany("DELETE FROM tasks WHERE id = ?", [(task["id"],) for task in tasks])
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        for task in tasks:
+            self._notify({"op": "archive", "id": task["id"]})
+        return len(tasks)
+
+    def _task_stats(self):
         """获取任务统计"""
-        total = len(self.tasks)
-        completed = len([t for t in self.tasks if t["status"] == "completed"])
+        total, completed = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(status = 'completed'), 0) FROM tasks"
+        ).fetchone()
+        priorities = dict(self.conn.execute(
+            "SELECT priority, COUNT(*) FROM tasks GROUP BY priority"
+        ).fetchall())
         pending = total - completed
 
-        priorities = {}
-        for task in self.tasks:
-            pri = task["priority"]
-            priorities[pri] = priorities.get(pri, 0) + 1
+        return {
+            "total": total,
+            "completed": completed,
+            "pending": pending,
+            "completion_rate": (completed / total * 100) if total > 0 else 0,
+            "priorities": priorities
+        }
+
+    def iter_tasks(self):
+        """逐行遍历所有任务"""
+        for row in self.conn.execute("SELECT * FROM tasks ORDER BY id"):
+            yield dict(row)
+
+    def compact(self):
+        """整理数据库文件"""
+        self.conn.execute("VACUUM")
+
+    def enable_autosave(self, interval: float = 1.0, max_pending: int = 100):
+        """每次修改都已在事务中提交，不需要自动保存"""
+
+    def close(self):
+        """关闭数据库连接"""
+        super().close()
+        self.conn.close()
+
+
+class SQLiteTaskSnapshot(TaskSnapshot):
+    """SQLite 的只读快照
+
+    在独立连接上开启读事务：WAL 模式下事务内的所有查询都只看到开始时的数据，
+    主连接上的写入照常进行。只能在创建它的线程中使用。
+    """
+
+    def __init__(self, filename: str):
+        self.conn = sqlite3.connect(filename, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("BEGIN")
+        # 读事务在第一次查询时才真正固定数据版本
+        total, completed = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(status = 'completed'), 0) FROM tasks").fetchone()
+        priorities = dict(self.conn.execute(
+            "SELECT priority, COUNT(*) FROM tasks GROUP BY priority").fetchall())
+        super().__init__(None, {
+            "total": total,
+            "completed": completed,
+            "pending": total - completed,
+            "completion_rate": (completed / total * 100) if total > 0 else 0,
+            "priorities": priorities
+        }, version=None)
+
+    def __len__(self):
+        return self.stats["total"]
+
+    def get_task(self, task_id: int):
+        row = self.conn.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return dict(row) if row else None
+
+    def iter_tasks(self):
+        for row in self.conn.execute("SELECT * FROM tasks ORDER BY id"):
+            yield dict(row)
+
+    def close(self):
+        """结束读事务并关闭连接"""
+        self.conn.close()
+
+
+# 导入CSV时识别 export_to_csv 使用的中文表头
+CSV_FIELD_NAMES = {"标题": "title", "优先级": "priority", "截止日期": "due_date", "描述": "description"}
+
+
+def validate_tasks(items) -> List[Dict[str, Any]]:
+    """校验一批任务数据，返回规范化后的字段字典列表"""
+    validated = []
+    for n, item in enumerate(items, start=1):
+        if isinstance(item, dict):
+            item = {CSV_FIELD_NAMES.get(key, key): value for key, value in item.items()}
+            title = item.get("title")
+            priority = item.get("priority") or "medium"
+            due_date = item.get("due_date") or None
+            description = item.get("description") or ""
+        elif isinstance(item, (list, tuple)):
+            title, priority, due_date, description = (list(item) + [None] * 4)[:4]
+            priority = priority or "medium"
+            description = description or ""
+        else:
+            raise ValueError(f"第 {n} 个任务格式无效")
+
+        if not isinstance(title, str) or not title.strip():
+            raise ValueError(f"第 {n} 个任务缺少标题")
+        if priority not in PRIORITIES:
+            raise ValueError(f"第 {n} 个任务的优先级无效: {priority}")
+        if due_date is not None:
+            try:
+                datetime.strptime(due_date, "%Y-%m-%d")
+            except (TypeError, ValueError):
+                raise ValueError(f"第 {n} 个任务的截止日期无效: {due_date}")
+
+        validated.append({
+            "title": title,
+            "priority": priority,
+            "due_date": due_date,
+            "description": description
+        })
+    return validated
+
+
+def _iter_json_array(f, chunk_size: int = 1 << 20):
+    """逐个解析JSON数组中的元素，不把整个文件读入内存"""
+    decoder = json.JSONDecoder()
+    separators = re.compile(r'[\s,]*')
+    whitespace = re.compile(r'\s*')
+    # 元素之后直到块末尾只有空白，或者只有不是分隔符的字符（被截断的数字、true 等）
+    truncated = re.compile(r'(?:\s*|[^\s,\]]+)\Z')
+    buf = f.read(chunk_size).lstrip()
+    if not buf.startswith('['):
+        raise ValueError("JSON文件必须是任务数组")
+    pos = 1
+    eof = False
+
+    while True:
+        pos = separators.match(buf, pos).end()
+        if pos < len(buf) and buf[pos] == ']':
+            return
+        try:
+            if pos == len(buf):
+                raise json.JSONDecodeError("需要更多数据", buf, pos)
+            obj, end = decoder.raw_decode(buf, pos)
+            # 数字等标量在块边界处被截断时也能解析出一部分（"12345" 只读到 "12"，
+            # "1.5e3" 只读到 "1.5"），后面跟着逗号或 ] 才说明元素已经完整
+            if not eof and truncated.match(buf, end):
+                raise json.JSONDecodeError("需要更多数据", buf, end)
+        except json.JSONDecodeError:
+            # 元素被块边界截断：读入下一块后重试
+            if eof:
+                raise
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+        end = whitespace.match(buf, end).end()
+        if end < len(buf) and buf[end] not in ',]':
+            raise ValueError("JSON数组的元素之间缺少逗号")
+        pos = end
+        yield obj
+
+
+def detect_task_format(filename: str) -> str:
+    """按扩展名判断任务文件格式（忽略 .gz 后缀）"""
+    if filename.endswith(".gz"):
+        filename = filename[:-3]
+    ext = os.path.splitext(filename)[1].lower()
+    return {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}.get(ext, "json")
+
+
+def iter_task_file(filename: str, fmt: str = None):
+    """流式读取CSV/JSON/NDJSON格式的任务文件（.gz 结尾时先解压）"""
+    fmt = fmt or detect_task_format(filename)
+    opener = gzip.open if filename.endswith(".gz") else open
+
+    with opener(filename, 'rt', newline='', encoding='utf-8-sig') as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        elif fmt == "ndjson":
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from _iter_json_array(f)
+
+
+EXPORT_BUFFER_SIZE = 1 << 20
+
+
+def open_export_file(filename: str, compress: bool = False):
+    """打开导出文件：文本层之下是 EXPORT_BUFFER_SIZE 大小的写缓冲区，需要时再经过gzip"""
+    raw = gzip.open(filename, 'wb', compresslevel=6) if compress else open(filename, 'wb')
+    buffered = io.BufferedWriter(raw, buffer_size=EXPORT_BUFFER_SIZE)
+    return io.TextIOWrapper(buffered, encoding='utf-8', newline='')
+
+
+class BinaryTaskManager(TaskManager):
+    """使用二进制快照的任务管理器
+
+    文件结构：
+      文件头   魔数、版本、next_id、各状态/优先级的计数、记录数、ID表位置
+      记录区   每条记录 = 状态(1B) + 优先级(1B) + 完成时间(19B) + 长度(4B) + 其余字段的JSON
+      ID表     按ID排序的 (id, 记录偏移) 数组
+
+    加载时只把文件内存映射（mmap），不解析任何记录：stats 只读文件头，
+    complete/delete 通过二分查找ID表定位记录并原地修改状态字节和文件头计数。
+    其他操作第一次访问任务列表时才整体解析，之后的修改会重写整个快照。
+    """
+
+    MAGIC = b"TASKBIN1"
+    FORMAT_VERSION = 1
+    # 魔数、版本、next_id、completed、pending、low、medium、high、记录数、ID表偏移
+    HEADER = struct.Struct("<8sIqqqqqqqq")
+    RECORD = struct.Struct("<BB19sI")
+    TABLE_ENTRY = struct.Struct("<qq")
+    STATUSES = STATUSES + ("deleted",)
+
+    def __init__(self, filename="tasks.bin"):
+        self._file = None
+        self._mm = None
+        super().__init__(filename, storage="binary")
+
+    @property
+    def tasks(self):
+        """所有任务，第一次访问时才解析整个快照"""
+        self._ensure_loaded()
+        return super().tasks
+
+    def _load_files(self):
+        """映射快照文件，只读取文件头"""
+        self._close_map()
+        if not os.path.exists(self.filename) or os.path.getsize(self.filename) == 0:
+            self._load_snapshot({"next_id": 1, "tasks": []})
+            return
+
+        self._file = open(self.filename, 'r+b')
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        header = self._read_header()
+        if header[0] != self.MAGIC or header[1] != self.FORMAT_VERSION:
+            raise ValueError(f"{self.filename} 不是有效的任务快照文件")
+        self.next_id = header[2]
+        # 还没有解析记录
+        self._store = None
+
+    def _close_map(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._file.close()
+            self._mm = None
+            self._file = None
+
+    def _read_header(self):
+        return list(self.HEADER.unpack_from(self._mm, 0))
+
+    def _write_header(self, header):
+        self.HEADER.pack_into(self._mm, 0, *header)
+
+    def _iter_records(self):
+        """按ID顺序遍历快照中未删除的记录，产生任务字典"""
+        header = self._read_header()
+        record_count, table_offset = header[8], header[9]
+        for i in range(record_count):
+            _, offset = self.TABLE_ENTRY.unpack_from(self._mm, table_offset + i * self.TABLE_ENTRY.size)
+            status, priority, completed_at, length = self.RECORD.unpack_from(self._mm, offset)
+            if self.STATUSES[status] == "deleted":
+                continue
+            start = offset + self.RECORD.size
+            task = json.loads(self._mm[start:start + length].decode('utf-8'))
+            yield {
+                "id": task["id"],
+                "title": task["title"],
+                "priority": PRIORITIES[priority],
+                "status": self.STATUSES[status],
+                "created_at": task["created_at"],
+                "due_date": task["due_date"],
+                "description": task["description"],
+                "completed_at": completed_at.rstrip(b"\0").decode('ascii') or None
+            }
+
+    def _find_record(self, task_id: int):
+        """二分查找ID表，返回记录偏移，不存在时返回None"""
+        header = self._read_header()
+        lo, hi = 0, header[8]
+        table_offset = header[9]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            entry_id, offset = self.TABLE_ENTRY.unpack_from(
+                self._mm, table_offset + mid * self.TABLE_ENTRY.size)
+            if entry_id == task_id:
+                return offset
+            if entry_id < task_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def _ensure_loaded(self):
+        """需要时解析整个快照到内存"""
+        if self._store is None:
+            self._load_snapshot({"next_id": self.next_id, "tasks": self._iter_records()})
+
+    def _capture_snapshot(self):
+        # 快照的内容还要从内存映射中读取，只能在线程锁内写出
+        staged = self._stage_snapshot()
+        return lambda: staged
+
+    def _stage_snapshot(self):
+        """把完整的二进制快照写入临时文件，返回临时文件名"""
+        self._ensure_loaded()
+        counts = {"completed": 0, "pending": 0}
+        priority_counts = dict.fromkeys(PRIORITIES, 0)
+        table = []
+
+        tmp_filename = f"{self.filename}.{os.getpid()}.tmp"
+        with open(tmp_filename, 'wb') as f:
+            f.write(b"\0" * self.HEADER.size)
+            offset = self.HEADER.size
+            for task_id in self._store.iter_ids():
+                task = self._store.get(task_id)
+                payload = json.dumps({
+                    "id": task["id"],
+                    "title": task["title"],
+                    "created_at": task["created_at"],
+                    "due_date": task["due_date"],
+                    "description": task["description"]
+                }, ensure_ascii=False).encode('utf-8')
+                completed_at = (task["completed_at"] or "").encode('ascii')
+                f.write(self.RECORD.pack(self.STATUSES.index(task["status"]),
+                                         PRIORITIES.index(task["priority"]),
+                                         completed_at, len(payload)))
+                f.write(payload)
+                table.append((task["id"], offset))
+                offset += self.RECORD.size + len(payload)
+                counts[task["status"]] += 1
+                priority_counts[task["priority"]] += 1
+
+            for entry in table:
+                f.write(self.TABLE_ENTRY.pack(*entry))
+            f.seek(0)
+            f.write(self.HEADER.pack(self.MAGIC, self.FORMAT_VERSION, self.next_id,
+                                     counts["completed"], counts["pending"],
+                                     *(priority_counts[p] for p in PRIORITIES),
+                                     len(table), offset))
+        return tmp_filename
+
+    def _install_snapshot(self, staged):
+        self._close_map()
+        os.replace(staged, self.filename)
+        # 内存中已有完整数据，重新映射新文件供下次原地修改使用
+        self._file = open(self.filename, 'r+b')
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+
+    def _apply(self, record: Dict[str, Any], replay: bool = False) -> bool:
+        self._ensure_loaded()
+        return super()._apply(record, replay)
+
+    def complete_task(self, task_id: int):
+        """完成任务（未解析快照时原地修改记录）"""
+        with self._lock() as f:
+            self._catch_up(*self._read_locked_state(f))
+            if self._store is None:
+                return self._modify_in_place(f, self._complete_record, {"op": "complete", "id": task_id})
+        return super().complete_task(task_id)
+
+    def delete_task(self, task_id: int):
+        """删除任务（未解析快照时只把记录标记为已删除）"""
+        with self._lock() as f:
+            self._catch_up(*self._read_locked_state(f))
+            if self._store is None:
+                return self._modify_in_place(f, self._delete_record, {"op": "delete", "id": task_id})
+        return super().delete_task(task_id)
+
+    def _modify_in_place(self, f, modify, record: Dict[str, Any]) -> bool:
+        """原地修改一条记录并更新版本号（调用者必须持有锁）"""
+        if not modify(record["id"]):
+            return False
+        self._mm.flush()
+        self.version += 1
+        self._write_locked_state(f, self.version, self.epoch)
+        self._notify(record)
+        return True
+
+    def _complete_record(self, task_id: int) -> bool:
+        """把记录的状态改为已完成，并更新文件头计数"""
+        offset = self._find_record(task_id)
+        if offset is None:
+            return False
+        status, priority, _, length = self.RECORD.unpack_from(self._mm, offset)
+        if self.STATUSES[status] == "deleted":
+            return False
+
+        completed_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.RECORD.pack_into(self._mm, offset, self.STATUSES.index("completed"),
+                              priority, completed_at.encode('ascii'), length)
+        if self.STATUSES[status] == "pending":
+            header = self._read_header()
+            header[3] += 1
+            header[4] -= 1
+            self._write_header(header)
+        return True
+
+    def _delete_record(self, task_id: int) -> bool:
+        """把记录标记为已删除，并更新文件头计数"""
+        offset = self._find_record(task_id)
+        if offset is None:
+            return False
+        status, priority, completed_at, length = self.RECORD.unpack_from(self._mm, offset)
+        if self.STATUSES[status] == "deleted":
+            return False
+
+        self.RECORD.pack_into(self._mm, offset, self.STATUSES.index("deleted"),
+                              priority, completed_at, length)
+        header = self._read_header()
+        header[3 if self.STATUSES[status] == "completed" else 4] -= 1
+        header[5 + priority] -= 1
+        self._write_header(header)
+        return True
+
+    def get_task(self, task_id: int):
+        """按ID获取任务"""
+        self._ensure_loaded()
+        return super().get_task(task_id)
+
+    def list_tasks(self, status: str = None, priority: str = None, where: str = None,
+                   offset: int = 0, limit: int = None):
+        """列出任务"""
+        self._ensure_loaded()
+        return super().list_tasks(status, priority, where, offset, limit)
+
+    def _peek_due(self, until: int, limit: int = None) -> List[int]:
+        self._ensure_loaded()
+        return super()._peek_due(until, limit)
+
+    def search(self, query: str, limit: int = None):
+        self._ensure_loaded()
+        return super().search(query, limit)
+
+    def _prepare_snapshot(self):
+        self._ensure_loaded()
+
+    def _task_stats(self):
+        """获取任务统计（未解析快照时直接读取文件头）"""
+        if self._store is not None:
+            return super()._task_stats()
+
+        header = self._read_header()
+        completed, pending = header[3], header[4]
+        total = completed + pending
+        priorities = {pri: count for pri, count in zip(PRIORITIES, header[5:8]) if count}
 
         return {
             "total": total,
@@ -104,27 +2549,490 @@ class TaskManager:
             "priorities": priorities
         }
 
-    def export_to_csv(self, filename: str):
-        """导出到CSV"""
-        with open(filename, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(["ID", "标题", "优先级", "状态", "创建时间", "截止日期", "描述", "完成时间"])
-
-            for task in self.tasks:
-                writer.writerow([
-                    task["id"],
-                    task["title"],
-                    task["priority"],
-                    task["status"],
-                    task["created_at"],
-                    task["due_date"] or "",
-                    task["description"] or "",
-                    task["completed_at"] or ""
-                ])
+    def iter_tasks(self):
+        """遍历所有任务（未解析快照时直接从映射的文件中逐条读取）"""
+        if self._store is not None:
+            return super().iter_tasks()
+        return self._iter_records()
+
+    def close(self):
+        """写出未保存的修改并关闭映射的文件"""
+        super().close()
+        self._close_map()
+
+
+def _read_shard_file(filename: str) -> List[Dict[str, Any]]:
+    """读取一个分片文件中的任务（在进程池中执行）"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        return json.load(f)["tasks"]
+
+
+class ShardedTaskManager(TaskManager):
+    """分片存储的任务管理器
+
+    任务按ID区间（每 shard_size 个ID一片）或按创建月份分散到 <filename>.d/ 目录下的
+    多个分片文件中，分片文件与JSON存储的快照格式相同。清单文件（filename）记录分区方式、
+    next_id 以及每个分片的ID范围和各状态、优先级的任务数。
+
+    加载时只读取清单，查询时才加载用得到的分片，多个分片用进程池并行解析：
+    list --status pending 会跳过没有待完成任务的分片，stats 直接汇总清单中的计数，
+    按ID查找只加载ID范围覆盖它的分片。每次提交只重写被修改的分片和清单。
+    """
+
+    PARTITIONS = ("id", "month")
+
+    def __init__(self, filename="tasks.shards.json", partition="id",
+                 shard_size: int = 10000, parallel: bool = True):
+        if partition not in self.PARTITIONS:
+            raise ValueError(f"无效的分区方式: {partition}")
+        # 已有清单时以清单中记录的分区方式为准
+        self.partition = partition
+        self.shard_size = shard_size
+        self.parallel = parallel
+        self.shard_dir = filename + ".d"
+        self._shards = {}
+        self._members = {}
+        self._dirty = set()
+        super().__init__(filename, storage="sharded")
+
+    def _load_files(self):
+        """只读取清单，分片在用到时才加载"""
+        manifest = {}
+        if os.path.exists(self.filename):
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        self.partition = manifest.get("partition", self.partition)
+        self.shard_size = manifest.get("shard_size", self.shard_size)
+        # 分片 -> {min_id, max_id, pending, completed, low, medium, high}
+        self._shards = manifest.get("shards", {})
+        # 已加载的分片 -> 其中的任务ID集合
+        self._members = {}
+        self._dirty = set()
+        self._load_snapshot({"next_id": manifest.get("next_id", 1), "tasks": []})
+
+    def _shard_key(self, task: Dict[str, Any]) -> str:
+        if self.partition == "month":
+            return task["created_at"][:7]
+        return f"{(task['id'] - 1) // self.shard_size:06d}"
+
+    def _shard_filename(self, key: str) -> str:
+        return os.path.join(self.shard_dir, f"{key}.json")
+
+    def _shards_for_id(self, task_id: int) -> List[str]:
+        """可能包含 task_id 的分片"""
+        return [key for key, meta in self._shards.items()
+                if meta["min_id"] <= task_id <= meta["max_id"]]
+
+    def _load_shards(self, keys):
+        """加载尚未加载的分片（调用者需保证期间文件不被替换）"""
+        missing = [key for key in dict.fromkeys(keys)
+                   if key not in self._members and key in self._shards]
+        if not missing:
+            return
+        filenames = [self._shard_filename(key) for key in missing]
+        if self.parallel and len(missing) > 1:
+            with multiprocessing.Pool(min(len(missing), os.cpu_count() or 1)) as pool:
+                results = pool.map(_read_shard_file, filenames)
+        else:
+            results = map(_read_shard_file, filenames)
+        for key, tasks in zip(missing, results):
+            self._members[key] = dict.fromkeys(task["id"] for task in tasks)
+            self._insert_tasks(tasks)
+
+    def _load_shards_for_query(self, keys):
+        """查询前加载需要的分片
+
+        查询不持有锁：加载前后各读一次快照代数，期间有其他进程提交就先合并再重新加载。
+        """
+        keys = list(keys)
+        while any(key not in self._members and key in self._shards for key in keys):
+            if self._lease is not None:
+                # 自动保存持有锁，文件不会被其他进程修改
+                self._load_shards(keys)
+                return
+            version, epoch = self._read_state()
+            if (version, epoch) != (self.version, self.epoch):
+                self.refresh()
+                continue
+            self._load_shards(keys)
+            if self._read_state()[1] != epoch:
+                self.refresh()
+
+    def _apply(self, record: Dict[str, Any], replay: bool = False) -> bool:
+        # 直接加载受影响的分片（提交前会检查版本号，期间分片被替换时会重新加载并重试）
+        if record["op"] == "add":
+            task = record["task"]
+            key = self._shard_key(task)
+            self._load_shards([key])
+            if not super()._apply(record, replay):
+                return False
+            if key not in self._shards:
+                self._shards[key] = {"min_id": task["id"], "max_id": task["id"],
+                                     "pending": 0, "completed": 0, "low": 0, "medium": 0, "high": 0}
+            meta = self._shards[key]
+            meta["min_id"] = min(meta["min_id"], task["id"])
+            meta["max_id"] = max(meta["max_id"], task["id"])
+            meta[task["status"]] += 1
+            meta[task["priority"]] += 1
+            self._members.setdefault(key, {})[task["id"]] = None
+            self._dirty.add(key)
+            return True
+
+        task_id = record["id"]
+        keys = self._shards_for_id(task_id)
+        self._load_shards(keys)
+        if task_id not in self._store:
+            return False
+        key = next(key for key in keys if task_id in self._members[key])
+        meta = self._shards[key]
+        status, priority = self._store.status(task_id), self._store.priority(task_id)
+        if not super()._apply(record, replay):
+            return False
+        meta[status] -= 1
+        if record["op"] == "complete":
+            meta["completed"] += 1
+        else:
+            meta[priority] -= 1
+            del self._members[key][task_id]
+        self._dirty.add(key)
+        return True
+
+    def _capture_snapshot(self):
+        # 只写出被修改的分片，依赖随修改变化的分片状态，只能在线程锁内写出
+        staged = self._stage_snapshot()
+        return lambda: staged
+
+    def _stage_snapshot(self):
+        """把被修改的分片和清单写入临时文件，返回 (临时文件名, 目标文件名) 列表
+
+        目标为 None 的项表示要删除的空分片；清单总是最后一项。
+        """
+        os.makedirs(self.shard_dir, exist_ok=True)
+        staged = []
+        for key in sorted(self._dirty):
+            shard_filename = self._shard_filename(key)
+            meta = self._shards[key]
+            if meta["pending"] + meta["completed"] == 0:
+                del self._shards[key]
+                del self._members[key]
+                staged.append((shard_filename, None))
+                continue
+            tmp_filename = f"{shard_filename}.{os.getpid()}.tmp"
+            self._write_snapshot_file(tmp_filename, self.next_id,
+                                      (self._store.get(task_id) for task_id in self._members[key]))
+            staged.append((tmp_filename, shard_filename))
+        self._dirty.clear()
+
+        manifest = {"next_id": self.next_id, "partition": self.partition,
+                    "shard_size": self.shard_size, "shards": self._shards}
+        tmp_filename = f"{self.filename}.{os.getpid()}.tmp"
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        staged.append((tmp_filename, self.filename))
+        return staged
+
+    def _install_snapshot(self, staged):
+        for tmp_filename, filename in staged:
+            if filename is None:
+                if os.path.exists(tmp_filename):
+                    os.remove(tmp_filename)
+            else:
+                os.replace(tmp_filename, filename)
+
+    def _discard_snapshot(self, staged):
+        for tmp_filename, filename in staged:
+            if filename is not None:
+                os.remove(tmp_filename)
+
+    @property
+    def tasks(self):
+        """所有任务（加载全部分片）"""
+        self._load_shards_for_query(self._shards)
+        return super().tasks
+
+    def get_task(self, task_id: int):
+        self._load_shards_for_query(self._shards_for_id(task_id))
+        return super().get_task(task_id)
+
+    def list_tasks(self, status: str = None, priority: str = None, where: str = None,
+                   offset: int = 0, limit: int = None):
+        """只加载含有符合条件任务的分片"""
+        statuses = {status} if status else None
+        priorities = {priority} if priority else None
+        if where:
+            task_filter = combine_filter(where, status, priority)
+            statuses, priorities = task_filter.statuses, task_filter.priorities
+        self._load_shards_for_query(
+            key for key, meta in self._shards.items()
+            if (statuses is None or any(meta.get(s) for s in statuses))
+            and (priorities is None or any(meta.get(p) for p in priorities)))
+        return super().list_tasks(status, priority, where, offset, limit)
+
+    def _peek_due(self, until: int, limit: int = None) -> List[int]:
+        self._load_shards_for_query(key for key, meta in self._shards.items() if meta["pending"])
+        return super()._peek_due(until, limit)
+
+    def search(self, query: str, limit: int = None):
+        self._load_shards_for_query(self._shards)
+        return super().search(query, limit)
+
+    def _prepare_snapshot(self):
+        """快照需要全部分片都在内存中"""
+        self._load_shards(self._shards)
+
+    def _task_stats(self):
+        """汇总清单中各分片的计数，不加载任何分片"""
+        completed = sum(meta["completed"] for meta in self._shards.values())
+        pending = sum(meta["pending"] for meta in self._shards.values())
+        total = completed + pending
+        priorities = {pri: sum(meta[pri] for meta in self._shards.values()) for pri in PRIORITIES}
+        return {
+            "total": total,
+            "completed": completed,
+            "pending": pending,
+            "completion_rate": (completed / total * 100) if total > 0 else 0,
+            "priorities": {pri: count for pri, count in priorities.items() if count}
+        }
+
+    def iter_tasks(self):
+        """逐个分片遍历所有任务，未加载的分片直接读文件，不放入内存"""
+        for key in sorted(self._shards):
+            if key in self._members:
+                for task_id in list(self._members[key]):
+                    yield self._store.get(task_id)
+            else:
+                yield from _read_shard_file(self._shard_filename(key))
+
+
+DEFAULT_FILENAMES = {"json": "tasks.json", "journal": "tasks.json",
+                     "sqlite": "tasks.db", "binary": "tasks.bin",
+                     "sharded": "tasks.shards.json"}
+
+
+def create_task_manager(storage: str = "json", filename: str = None, **options):
+    """按存储方式创建任务管理器（options 传给分片存储，如 partition、shard_size）"""
+    filename = filename or DEFAULT_FILENAMES[storage]
+    if storage == "sqlite":
+        return SQLiteTaskManager(filename)
+    if storage == "binary":
+        return BinaryTaskManager(filename)
+    if storage == "sharded":
+        return ShardedTaskManager(filename, **options)
+    return TaskManager(filename, storage=storage)
+
+
+class TimingWheel:
+    """分层时间轮
+
+    时间按 tick 秒划分为刻度。第 0 层的每个槽对应一个刻度，第 k 层的每个槽对应
+    slots**k 个刻度；定时器按剩余时间放入能容纳它的最低一层。槽是以键为键的字典，
+    _where 记录每个键所在的槽，所以添加和取消都是 O(1)，取消不会留下失效元素。
+
+    时间每前进一个刻度只取走第 0 层的一个槽；第 k 层转完一圈时，把第 k+1 层
+    当前槽中的定时器重新分配到下面的层（级联），每个定时器最多级联 levels-1 次。
+    默认 6 层、每层 64 槽，一秒一个刻度时能容纳两千多年。
+    """
+
+    def __init__(self, start: float, tick: float = 1.0, slots: int = 64, levels: int = 6):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.current = int(start // tick)
+        self._wheels = [[{} for _ in range(slots)] for _ in range(levels)]
+        # 已经到期、等待下一次 advance 取走的定时器
+        self._ready = {}
+        self._where = {}
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, key):
+        return key in self._where
+
+    def schedule(self, key, when: float):
+        """在时间戳 when 到期时触发 key（key 已有定时器时替换它）"""
+        self.cancel(key)
+        self._place(key, math.ceil(when / self.tick))
+
+    def cancel(self, key) -> bool:
+        """取消 key 的定时器，不存在时返回False"""
+        bucket = self._where.pop(key, None)
+        if bucket is None:
+            return False
+        del bucket[key]
+        return True
+
+    def _place(self, key, expire: int):
+        delta = expire - self.current
+        if delta <= 0:
+            bucket = self._ready
+        else:
+            level = 0
+            while level < self.levels - 1 and delta >= self.slots ** (level + 1):
+                level += 1
+            bucket = self._wheels[level][(expire // self.slots ** level) % self.slots]
+        bucket[key] = expire
+        self._where[key] = bucket
+
+    def _take(self, bucket) -> list:
+        keys = list(bucket)
+        for key in keys:
+            del self._where[key]
+        bucket.clear()
+        return keys
+
+    def advance(self, now: float) -> list:
+        """把时间推进到时间戳 now，返回期间到期的键（按到期先后）"""
+        target = int(now // self.tick)
+        fired = self._take(self._ready)
+        while self.current < target:
+            if not self._where:
+                # 没有定时器时直接跳到目标刻度
+                self.current = target
+                break
+            self.current += 1
+            for level in range(1, self.levels):
+                if self.current % self.slots ** level:
+                    break
+                bucket = self._wheels[level][(self.current // self.slots ** level) % self.slots]
+                items = list(bucket.items())
+                bucket.clear()
+                for key, expire in items:
+                    self._place(key, expire)
+            fired.extend(self._take(self._ready))
+            fired.extend(self._take(self._wheels[0][self.current % self.slots]))
+        return fired
+
+
+class ReminderService:
+    """截止日期提醒服务
+
+    待完成任务的提醒时间是截止日期当天零点减去 lead，按任务ID放入 TimingWheel。
+    服务注册为任务管理器的监听器：添加任务时放入时间轮，完成、删除、归档时取消，
+    都是 O(1)，不需要定期扫描任务列表。已经过了截止日期的任务不再提醒（用 overdue 查看）。
+
+    管理器整体重新加载时只做标记，下一次 poll 在锁外重建时间轮；重建期间收到的
+    修改记录先暂存，建好后再应用一遍。poll 不会合并其他进程的修改，需要时由调用者
+    先调用 task_manager.refresh()。
+
+    只有日志存储（journal）能把其他进程的修改逐条交给监听器；其他存储方式下
+    其他进程每提交一次，refresh() 都会整体重新加载并触发一次O(n)的重建，
+    所以长期运行的提醒服务应使用日志存储。
+    """
+
+    QUERY = "status = pending and due_date != null"
+
+    def __init__(self, task_manager, lead: timedelta = timedelta(days=1),
+                 callback=None, tick: float = 1.0):
+        self.task_manager = task_manager
+        self.lead = lead
+        self.callback = callback or self.print_reminder
+        self.tick = tick
+        self.wheel = TimingWheel(time.time(), tick)
+        self._lock = threading.Lock()
+        # 已经提醒过的任务，重建时间轮时不再重复提醒
+        self._fired = set()
+        self._stale = True
+        self._replay = None
+        task_manager.add_listener(self._on_change)
+
+    @staticmethod
+    def print_reminder(task: Dict[str, Any]):
+        print(f"[提醒] 任务 {task['id']} 「{task['title']}」 将于 {task['due_date']} 到期", flush=True)
+
+    def remind_at(self, task: Dict[str, Any]):
+        """任务的提醒时间戳，不需要提醒时（包括旧数据中无法解析的截止日期）返回None"""
+        if task["status"] != "pending" or not task["due_date"]:
+            return None
+        try:
+            due = datetime.combine(date.fromisoformat(task["due_date"]), datetime.min.time())
+        except ValueError:
+            return None
+        if (due + timedelta(days=1)).timestamp() <= self.wheel.current * self.tick:
+            return None
+        return (due - self.lead).timestamp()
+
+    def _schedule(self, task: Dict[str, Any]):
+        when = self.remind_at(task)
+        if when is not None and task["id"] not in self._fired:
+            self.wheel.schedule(task["id"], when)
+
+    def _handle(self, record: Dict[str, Any]):
+        op = record["op"]
+        if op == "reload":
+            self._stale = True
+        elif op == "add":
+            self._schedule(record["task"])
+        else:
+            self.wheel.cancel(record["id"])
+            self._fired.discard(record["id"])
+
+    def _on_change(self, record: Dict[str, Any]):
+        with self._lock:
+            if self._replay is not None:
+                self._replay.append(record)
+            self._handle(record)
+
+    def rebuild(self):
+        """按当前的待完成任务重建时间轮"""
+        with self._lock:
+            self._stale = False
+            self._replay = []
+        try:
+            tasks = list(self.task_manager.list_tasks(where=self.QUERY))
+        except BaseException:
+            with self._lock:
+                self._stale = True
+                self._replay = None
+            raise
+        with self._lock:
+            self.wheel = TimingWheel(self.wheel.current * self.tick, self.tick)
+            self._fired &= {task["id"] for task in tasks}
+            for task in tasks:
+                self._schedule(task)
+            for record in self._replay:
+                self._handle(record)
+            self._replay = None
+
+    def poll(self, now: float = None) -> List[Dict[str, Any]]:
+        """推进时间轮，对到期的任务调用 callback，返回这些任务"""
+        if self._stale:
+            self.rebuild()
+        with self._lock:
+            task_ids = self.wheel.advance(time.time() if now is None else now)
+            self._fired.update(task_ids)
+        reminded = []
+        for task_id in task_ids:
+            task = self.task_manager.get_task(task_id)
+            if task is not None and task["status"] == "pending":
+                self.callback(task)
+                reminded.append(task)
+        return reminded
+
+    def __len__(self):
+        return len(self.wheel)
 
 # 2. 命令行接口
 print("\n=== 2. 命令行接口 ===")
 
+def parse_days(text: str) -> int:
+    """把 7d、2w、10 这样的时间范围解析为天数"""
+    match = re.fullmatch(r'(\d+)([dw]?)', text.strip().lower())
+    if not match:
+        raise argparse.ArgumentTypeError(f"无效的时间范围: {text}（示例: 7d、2w）")
+    days = int(match.group(1))
+    return days * 7 if match.group(2) == 'w' else days
+
+
+def parse_date(text: str) -> str:
+    """校验 YYYY-MM-DD 格式的日期"""
+    try:
+        datetime.strptime(text, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的日期: {text}（格式: YYYY-MM-DD）")
+    return text
+
+
 def create_parser():
     """创建命令行参数解析器"""
     parser = argparse.ArgumentParser(
@@ -135,10 +3043,35 @@ def create_parser():
   python task_cli.py add "学习Python" --priority high
   python task_cli.py list --status pending
   python task_cli.py complete 1
+  python task_cli.py list --offset 100 --limit 50 --page-size 20
+  python task_cli.py list --where "priority in (high, medium) and due_date <= today+7"
+  python task_cli.py due --within 7d
+  python task_cli.py archive --older-than 30d
+  python task_cli.py stats --include-archive
+  python task_cli.py export --filename done.ndjson.gz --status completed --since 2024-01-01
+  python task_cli.py search "Python OR 算法"
   python task_cli.py stats
   python task_cli.py export --format csv
+  python task_cli.py --storage journal add "学习Python"
+  python task_cli.py --storage sqlite list --status pending
+  python task_cli.py --storage binary stats
+  python task_cli.py --storage sharded --shard-by month list --status pending
+  python task_cli.py --storage journal remind --lead 2d
+  python task_cli.py daemon &
+  python task_client.py list --status pending
         """
     )
+    parser.add_argument('--storage', choices=['json', 'journal', 'sqlite', 'binary', 'sharded'],
+                        default=os.environ.get('TASK_STORAGE', 'json'),
+                        help='存储方式 (也可通过环境变量 TASK_STORAGE 设置)')
+    parser.add_argument('--socket', default=os.environ.get('TASK_SOCKET', 'tasks.sock'),
+                        help='守护进程的Unix套接字路径 (也可通过环境变量 TASK_SOCKET 设置)')
+    parser.add_argument('--no-daemon', action='store_true',
+                        help='不连接守护进程，直接读写任务文件')
+    parser.add_argument('--shard-by', choices=['id', 'month'], default='id',
+                        help='分片存储的分区方式，只在新建时生效 (默认按ID区间)')
+    parser.add_argument('--shard-size', type=int, default=10000,
+                        help='按ID分区时每个分片的ID数 (默认10000)')
 
     subparsers = parser.add_subparsers(dest='command', help='可用命令')
 
@@ -156,6 +3089,23 @@ def create_parser():
                            help='按状态过滤')
     list_parser.add_argument('--priority', choices=['low', 'medium', 'high'],
                            help='按优先级过滤')
+    list_parser.add_argument('--where', help='过滤表达式，如 "priority in (high, medium) and due_date <= today+7"')
+    list_parser.add_argument('--limit', type=int, help='最多显示的任务数')
+    list_parser.add_argument('--offset', type=int, default=0, help='跳过前 N 个任务')
+    list_parser.add_argument('--page-size', type=int, help='每页行数，每页重复表头')
+
+    # 即将到期 / 已过期
+    due_parser = subparsers.add_parser('due', help='列出即将到期的待完成任务（含已过期）')
+    due_parser.add_argument('--within', type=parse_days, default=7,
+                            help='时间范围，如 7d、2w (默认7天)')
+    due_parser.add_argument('--limit', type=int, default=20, help='最多显示的任务数')
+    overdue_parser = subparsers.add_parser('overdue', help='列出已过期的待完成任务')
+    overdue_parser.add_argument('--limit', type=int, default=20, help='最多显示的任务数')
+
+    # 全文搜索
+    search_parser = subparsers.add_parser('search', help='按标题和描述搜索任务')
+    search_parser.add_argument('query', help='搜索词，空格表示同时包含，OR 表示任一组满足')
+    search_parser.add_argument('--limit', type=int, default=20, help='最多显示的任务数')
 
     # 完成任务
     complete_parser = subparsers.add_parser('complete', help='完成任务')
@@ -166,13 +3116,51 @@ def create_parser():
     delete_parser.add_argument('task_id', type=int, help='任务ID')
 
     # 统计信息
-    subparsers.add_parser('stats', help='显示统计信息')
+    stats_parser = subparsers.add_parser('stats', help='显示统计信息')
+    stats_parser.add_argument('--include-archive', action='store_true', help='包含已归档的任务')
+
+    # 归档
+    archive_parser = subparsers.add_parser('archive', help='把较早完成的任务移入压缩归档')
+    archive_parser.add_argument('--older-than', type=parse_days, default=30,
+                                help='完成时间早于多久之前，如 30d、4w (默认30天)')
+    archive_parser.add_argument('--codec', choices=list(TaskArchive.CODECS), default='gzip',
+                                help='压缩方式 (默认gzip)')
+
+    # 批量导入
+    import_parser = subparsers.add_parser('import', help='从CSV/JSON/NDJSON文件批量导入任务')
+    import_parser.add_argument('filename', help='导入文件名')
+    import_parser.add_argument('--format', choices=['csv', 'json', 'ndjson'],
+                               help='文件格式 (默认按扩展名判断)')
+    import_parser.add_argument('--batch-size', type=int, default=100000,
+                               help='每批导入的任务数，每批只持久化一次')
 
     # 导出功能
     export_parser = subparsers.add_parser('export', help='导出任务')
-    export_parser.add_argument('--format', choices=['csv', 'json'],
-                              default='json', help='导出格式')
-    export_parser.add_argument('--filename', help='导出文件名')
+    export_parser.add_argument('--format', choices=['csv', 'json', 'ndjson'],
+                              help='导出格式 (默认按文件名判断，没有文件名时为json)')
+    export_parser.add_argument('--filename', help='导出文件名，以 .gz 结尾时压缩')
+    export_parser.add_argument('--gzip', action='store_true', help='用gzip压缩')
+    export_parser.add_argument('--status', choices=['pending', 'completed'], help='按状态过滤')
+    export_parser.add_argument('--priority', choices=['low', 'medium', 'high'], help='按优先级过滤')
+    export_parser.add_argument('--since', type=parse_date, help='创建日期不早于 YYYY-MM-DD')
+    export_parser.add_argument('--until', type=parse_date, help='创建日期不晚于 YYYY-MM-DD')
+    export_parser.add_argument('--include-archive', action='store_true', help='包含已归档的任务')
+
+    # 截止日期提醒
+    remind_parser = subparsers.add_parser(
+        'remind', help='在前台运行提醒服务，任务临近截止日期时输出提醒（建议使用 --storage journal）')
+    remind_parser.add_argument('--lead', type=parse_days, default=1,
+                               help='提前多久提醒，如 1d、1w (默认1天)')
+    remind_parser.add_argument('--interval', type=float, default=1.0,
+                               help='检查间隔秒数 (默认1秒)')
+
+    # 守护进程
+    subparsers.add_parser('daemon', help='启动守护进程，在内存中保存任务并通过Unix套接字提供服务')
+
+    # 并发写入压力测试
+    stress_parser = subparsers.add_parser('stress', help='多进程并发添加任务，检查是否丢失更新')
+    stress_parser.add_argument('--processes', type=int, default=4, help='进程数')
+    stress_parser.add_argument('--count', type=int, default=200, help='每个进程添加的任务数')
 
     return parser
 
@@ -180,56 +3168,77 @@ def create_parser():
 print("\n=== 3. 格式化输出工具 ===")
 
 class OutputFormatter:
-    """输出格式化工具"""
+    """输出格式化工具
 
-    @staticmethod
-    def print_task_table(tasks):
-        """打印任务表格"""
-        if not tasks:
-            print("没有找到任务")
-            return
+    print_task_table 流式输出：只取前 SAMPLE_SIZE 行估算列宽，之后边读边写，
+    每 FLUSH_ROWS 行合并成一次 write，内存占用与任务总数无关。
+    """
 
-        # 计算列宽
-        headers = ["ID", "标题", "优先级", "状态", "创建时间", "截止日期"]
-        col_widths = []
+    HEADERS = ["ID", "标题", "优先级", "状态", "创建时间", "截止日期"]
+    SAMPLE_SIZE = 1000
+    FLUSH_ROWS = 5000
+
+    @staticmethod
+    def _row_values(task):
+        return (
+            str(task["id"]),
+            task["title"][:20],
+            task["priority"],
+            task["status"],
+            task["created_at"][:10],
+            task["due_date"] or ""
+        )
 
-        # 计算标题宽度
-        for header in headers:
-            col_widths.append(len(header))
+    @staticmethod
+    def _page(tasks, offset=0, limit=None):
+        """取出 [offset, offset + limit) 范围的任务，序列直接切片，迭代器逐个跳过"""
+        stop = None if limit is None else offset + limit
+        if hasattr(tasks, "__getitem__") and hasattr(tasks, "__len__"):
+            return iter(tasks[offset:stop])
+        return itertools.islice(tasks, offset, stop)
 
-        # 计算内容宽度
-        for task in tasks:
-            values = [
-                str(task["id"]),
-                task["title"][:20],
-                task["priority"],
-                task["status"],
-                task["created_at"][:10],
-                task["due_date"] or ""
-            ]
+    @staticmethod
+    def print_task_table(tasks, limit=None, offset=0, page_size=None, out=None):
+        """打印任务表格
 
-            for i, value in enumerate(values):
-                col_widths[i] = max(col_widths[i], len(value))
+        tasks 可以是列表、TaskList 或任意迭代器；page_size 不为空时每页重复表头。
+        """
+        out = out or sys.stdout
+        rows = map(OutputFormatter._row_values, OutputFormatter._page(tasks, offset, limit))
 
-        # 打印表格
-        # 表头
-        header_line = " | ".join(headers[i].ljust(col_widths[i]) for i in range(len(headers)))
-        print(header_line)
-        print("-" * len(header_line))
+        # 用前若干行估算列宽，后面更长的值只会让该行错位，不会截断
+        sample = list(itertools.islice(rows, OutputFormatter.SAMPLE_SIZE))
+        if not sample:
+            print("没有找到任务", file=out)
+            return
 
-        # 内容
-        for task in tasks:
-            values = [
-                str(task["id"]),
-                task["title"][:20],
-                task["priority"],
-                task["status"],
-                task["created_at"][:10],
-                task["due_date"] or ""
-            ]
-
-            line = " | ".join(values[i].ljust(col_widths[i]) for i in range(len(values)))
-            print(line)
+        headers = OutputFormatter.HEADERS
+        col_widths = [len(header) for header in headers]
+        for values in sample:
+            for i, value in enumerate(values):
+                if len(value) > col_widths[i]:
+                    col_widths[i] = len(value)
+
+        header_line = " | ".join(header.ljust(width) for header, width in zip(headers, col_widths))
+        header_block = [header_line, "-" * len(header_line)]
+
+        buffer = []
+        count = 0
+        for values in itertools.chain(sample, rows):
+            if page_size and count and count % page_size == 0:
+                buffer.append("")
+            if count == 0 or (page_size and count % page_size == 0):
+                if page_size:
+                    buffer.append(f"--- 第 {count // page_size + 1} 页 ---")
+                buffer.extend(header_block)
+            buffer.append(" | ".join(value.ljust(width) for value, width in zip(values, col_widths)))
+            count += 1
+            if len(buffer) >= OutputFormatter.FLUSH_ROWS:
+                out.write("\n".join(buffer) + "\n")
+                buffer.clear()
+        if buffer:
+            out.write("\n".join(buffer) + "\n")
+        out.flush()
 
     @staticmethod
     def print_stats(stats):
@@ -256,21 +3265,76 @@ def main():
         parser.print_help()
         return
 
-    task_manager = TaskManager()
+    if args.command == 'daemon':
+        run_daemon(args.storage, args.socket)
+        return
+
+    if args.command == 'stress':
+        stress_test(args.processes, args.count, args.storage)
+        return
+
+    options = {}
+    if args.storage == "sharded":
+        options = {"partition": args.shard_by, "shard_size": args.shard_size}
+
+    if args.command == 'remind':
+        run_reminders(create_task_manager(args.storage, **options), args.lead, args.interval)
+        return
+
+    # 守护进程正在运行时把命令转发给它，省去加载任务文件的开销
+    if not args.no_daemon:
+        output = send_to_daemon(args.socket, args.storage, sys.argv[1:])
+        if output is not None:
+            print(output, end='')
+            return
+
+    task_manager = create_task_manager(args.storage, **options)
+    run_command(args, task_manager)
+    task_manager.close()
+
+
+def export_target(args):
+    """根据 export 命令的参数确定导出格式和文件名"""
+    fmt = args.format or (detect_task_format(args.filename) if args.filename else 'json')
+    filename = args.filename or f"tasks_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    if args.gzip and not filename.endswith(".gz"):
+        filename += ".gz"
+    return fmt, filename
+
+
+def run_command(args, task_manager, snapshot=None):
+    """执行一条子命令（snapshot 是 export 使用的已创建的快照）"""
     formatter = OutputFormatter()
 
     if args.command == 'add':
-        task_id = task_manager.add_task(
-            title=args.title,
-            priority=args.priority,
-            due_date=args.due_date,
-            description=args.description or ""
-        )
-        print(f"任务已添加，ID: {task_id}")
+        try:
+            task_id = task_manager.add_task(
+                title=args.title,
+                priority=args.priority,
+                due_date=args.due_date,
+                description=args.description or ""
+            )
+            print(f"任务已添加，ID: {task_id}")
+        except ValueError as e:
+            print(f"添加失败: {e}")
 
     elif args.command == 'list':
-        tasks = task_manager.list_tasks(status=args.status, priority=args.priority)
-        formatter.print_task_table(tasks)
+        try:
+            tasks = task_manager.list_tasks(status=args.status, priority=args.priority, where=args.where,
+                                            offset=args.offset, limit=args.limit)
+        except ValueError as e:
+            print(f"过滤表达式错误: {e}")
+            return
+        formatter.print_task_table(tasks, page_size=args.page_size)
+
+    elif args.command == 'search':
+        formatter.print_task_table(task_manager.search(args.query, args.limit))
+
+    elif args.command == 'due':
+        formatter.print_task_table(task_manager.due_tasks(args.within, args.limit))
+
+    elif args.command == 'overdue':
+        formatter.print_task_table(task_manager.overdue_tasks(args.limit))
 
     elif args.command == 'complete':
         if task_manager.complete_task(args.task_id):
@@ -285,19 +3349,171 @@ def main():
             print(f"任务 {args.task_id} 不存在")
 
     elif args.command == 'stats':
-        stats = task_manager.get_task_stats()
+        stats = task_manager.get_task_stats(include_archive=args.include_archive)
         formatter.print_stats(stats)
 
+    elif args.command == 'archive':
+        task_manager.archive.codec = args.codec
+        count = task_manager.archive_completed(args.older_than)
+        print(f"已归档 {count} 个任务")
+
+    elif args.command == 'import':
+        imported = 0
+        batch = []
+        try:
+            for item in iter_task_file(args.filename, args.format):
+                batch.append(item)
+                if len(batch) >= args.batch_size:
+                    imported += len(task_manager.add_tasks(batch))
+                    batch = []
+            imported += len(task_manager.add_tasks(batch))
+        except ValueError as e:
+            print(f"导入失败: {e}")
+        print(f"已导入 {imported} 个任务")
+
     elif args.command == 'export':
-        if args.format == 'csv':
-            filename = args.filename or f"tasks_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            task_manager.export_to_csv(filename)
-            print(f"任务已导出到 {filename}")
-        elif args.format == 'json':
-            filename = args.filename or f"tasks_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(task_manager.tasks, f, ensure_ascii=False, indent=2)
-            print(f"任务已导出到 {filename}")
+        fmt, filename = export_target(args)
+        count = task_manager.export_tasks(filename, fmt, status=args.status, priority=args.priority,
+                                          since=args.since, until=args.until,
+                                          include_archive=args.include_archive, snapshot=snapshot)
+        print(f"已导出 {count} 个任务到 {filename}")
+
+
+class TaskRequestHandler(socketserver.StreamRequestHandler):
+    """处理一次客户端请求：读取一行JSON请求，返回一行JSON响应"""
+
+    def handle(self):
+        server = self.server
+        request = json.loads(self.rfile.readline().decode('utf-8'))
+        if request["storage"] != server.storage:
+            response = {"ok": False, "output": ""}
+        else:
+            output = io.StringIO()
+            server.stdout.local.stream = output
+            status = 0
+            try:
+                self.run(request)
+            except SystemExit as e:
+                # 只有 argparse 会抛出 SystemExit；参数有误（退出码非0）时让客户端
+                # 回退到本地解析，由 argparse 输出错误信息并返回正确的退出码
+                status = e.code
+            finally:
+                del server.stdout.local.stream
+            response = {"ok": not status, "output": output.getvalue()}
+        self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode('utf-8'))
+
+    def run(self, request):
+        server = self.server
+        args = server.parser.parse_args(request["argv"])
+        if args.command == 'export':
+            # 只在创建快照时持有命令锁，写文件时其他请求照常处理
+            with server.command_lock:
+                server.task_manager.refresh()
+                snapshot = server.task_manager.snapshot()
+            # 相对路径按客户端的工作目录解析
+            fmt, filename = export_target(args)
+            args.format, args.filename = fmt, os.path.join(request["cwd"], filename)
+            run_command(args, server.task_manager, snapshot)
+            return
+        with server.command_lock:
+            # 相对路径（导入文件）按客户端的工作目录解析
+            os.chdir(request["cwd"])
+            # 其他进程可能绕过守护进程直接写入了任务文件
+            server.task_manager.refresh()
+            run_command(args, server.task_manager)
+
+
+class ThreadLocalOutput(io.TextIOBase):
+    """按线程分发的输出流：设置了 local.stream 的线程写到自己的缓冲区，其他线程写到 default
+
+    多个输出流（stdout、stderr）可以共用同一个 local，把同一线程的输出都收集到一处。
+    """
+
+    def __init__(self, default, local: threading.local = None):
+        self.default = default
+        self.local = local or threading.local()
+
+    def write(self, text):
+        return getattr(self.local, "stream", self.default).write(text)
+
+    def flush(self):
+        getattr(self.local, "stream", self.default).flush()
+
+
+class TaskDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """任务守护进程：常驻内存的 TaskManager
+
+    每个请求一个线程。普通命令在 command_lock 下逐个执行；export 在快照上进行，
+    不持有命令锁，长时间的导出不会阻塞其他请求。
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, storage: str):
+        self.storage = storage
+        self.parser = create_parser()
+        self.command_lock = threading.Lock()
+        # 各请求线程的输出互不干扰
+        self.stdout = ThreadLocalOutput(sys.stdout)
+        self.stderr = ThreadLocalOutput(sys.stderr, self.stdout.local)
+        # 守护进程会切换工作目录，任务文件必须使用绝对路径
+        self.task_manager = create_task_manager(
+            storage, os.path.abspath(DEFAULT_FILENAMES[storage]))
+        super().__init__(socket_path, TaskRequestHandler)
+
+
+def run_daemon(storage: str, socket_path: str):
+    """启动守护进程"""
+    if not hasattr(socket, "AF_UNIX"):
+        print("当前系统不支持Unix套接字，无法启动守护进程")
+        return
+
+    socket_path = os.path.abspath(socket_path)
+    if os.path.exists(socket_path):
+        if send_to_daemon(socket_path, storage, ["stats"]) is not None:
+            print(f"守护进程已在运行: {socket_path}")
+            return
+        # 上次异常退出留下的套接字文件
+        os.remove(socket_path)
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    server = TaskDaemon(socket_path, storage)
+    sys.stdout, sys.stderr = server.stdout, server.stderr
+    signal.signal(signal.SIGTERM, stop)
+    print(f"守护进程已启动: {socket_path} (存储方式: {storage})，按 Ctrl+C 停止")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n守护进程已停止")
+    finally:
+        server.server_close()
+        server.task_manager.close()
+        os.remove(socket_path)
+        sys.stdout, sys.stderr = server.stdout.default, server.stderr.default
+
+
+def run_reminders(task_manager, lead_days: int = 1, interval: float = 1.0):
+    """在前台运行提醒服务，每隔 interval 秒合并其他进程的修改并检查到期的提醒"""
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    if task_manager.journal is None:
+        print(f"提示: {task_manager.storage} 存储下其他进程每次修改都会让提醒服务重新读取全部任务，"
+              "任务较多时请使用 --storage journal", file=sys.stderr)
+    service = ReminderService(task_manager, lead=timedelta(days=lead_days), tick=interval)
+    signal.signal(signal.SIGTERM, stop)
+    print(f"提醒服务已启动（提前 {lead_days} 天提醒），按 Ctrl+C 停止", flush=True)
+    try:
+        while True:
+            task_manager.refresh()
+            service.poll()
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\n提醒服务已停止")
+    finally:
+        task_manager.close()
 
 # 5. 交互式模式
 print("\n=== 5. 交互式模式 ===")
@@ -305,80 +3521,90 @@ print("\n=== 5. 交互式模式 ===")
 def interactive_mode():
     """交互式模式"""
     task_manager = TaskManager()
+    task_manager.enable_autosave()
     formatter = OutputFormatter()
 
-    print("\n=== 任务管理器 - 交互式模式 ===")
-    print("输入 'help' 查看可用命令，'quit' 退出")
+    def stop(signum, frame):
+        raise KeyboardInterrupt
 
-    while True:
-        try:
-            command = input("\n> ").strip().lower()
+    signal.signal(signal.SIGTERM, stop)
 
-            if command in ['quit', 'exit', 'q']:
-                print("再见！")
-                break
-
-            elif command == 'help':
-                print("""
-可用命令:
-  add <title>           - 添加任务
-  list                   - 列出所有任务
-  complete <id>          - 完成任务
-  delete <id>            - 删除任务
-  stats                  - 显示统计
-  clear                  - 清屏
-  help                   - 显示帮助
-  quit                   - 退出程序
-                """)
-
-            elif command == 'clear':
-                os.system('cls' if os.name == 'nt' else 'clear')
-
-            elif command == 'stats':
-                stats = task_manager.get_task_stats()
-                formatter.print_stats(stats)
-
-            elif command == 'list':
-                tasks = task_manager.list_tasks()
-                formatter.print_task_table(tasks)
-
-            elif command.startswith('add '):
-                title = command[4:].strip()
-                if title:
-                    task_id = task_manager.add_task(title)
-                    print(f"任务已添加，ID: {task_id}")
-                else:
-                    print("请输入任务标题")
-
-            elif command.startswith('complete '):
-                try:
-                    task_id = int(command[9:].strip())
-                    if task_manager.complete_task(task_id):
-                        print(f"任务 {task_id} 已完成")
-                    else:
-                        print(f"任务 {task_id} 不存在")
-                except ValueError:
-                    print("请输入有效的任务ID")
+    print("\n=== 任务管理器 - 交互式模式 ===")
+    print("输入 'help' 查看可用命令，'quit' 退出")
 
-            elif command.startswith('delete '):
-                try:
-                    task_id = int(command[7:].strip())
-                    if task_manager.delete_task(task_id):
-                        print(f"任务 {task_id} 已删除")
+    try:
+        while True:
+            try:
+                command = input("\n> ").strip().lower()
+
+                if command in ['quit', 'exit', 'q']:
+                    print("再见！")
+                    break
+
+                elif command == 'help':
+                    print("""
+    可用命令:
+      add <title>           - 添加任务
+      list                   - 列出所有任务
+      complete <id>          - 完成任务
+      delete <id>            - 删除任务
+      stats                  - 显示统计
+      clear                  - 清屏
+      help                   - 显示帮助
+      quit                   - 退出程序
+                    """)
+
+                elif command == 'clear':
+                    os.system('cls' if os.name == 'nt' else 'clear')
+
+                elif command == 'stats':
+                    stats = task_manager.get_task_stats()
+                    formatter.print_stats(stats)
+
+                elif command == 'list':
+                    tasks = task_manager.list_tasks()
+                    formatter.print_task_table(tasks)
+
+                elif command.startswith('add '):
+                    title = command[4:].strip()
+                    if title:
+                        task_id = task_manager.add_task(title)
+                        print(f"任务已添加，ID: {task_id}")
                     else:
-                        print(f"任务 {task_id} 不存在")
-                except ValueError:
-                    print("请输入有效的任务ID")
+                        print("请输入任务标题")
+
+                elif command.startswith('complete '):
+                    try:
+                        task_id = int(command[9:].strip())
+                        if task_manager.complete_task(task_id):
+                            print(f"任务 {task_id} 已完成")
+                        else:
+                            print(f"任务 {task_id} 不存在")
+                    except ValueError:
+                        print("请输入有效的任务ID")
+
+                elif command.startswith('delete '):
+                    try:
+                        task_id = int(command[7:].strip())
+                        if task_manager.delete_task(task_id):
+                            print(f"任务 {task_id} 已删除")
+                        else:
+                            print(f"任务 {task_id} 不存在")
+                    except ValueError:
+                        print("请输入有效的任务ID")
 
-            else:
-                print(f"未知命令: {command}，输入 'help' 查看可用命令")
+                else:
+                    print(f"未知命令: {command}，输入 'help' 查看可用命令")
 
-        except KeyboardInterrupt:
-            print("\n\n再见！")
-            break
-        except EOFError:
-            print("\n再见！")
-            break
+            except KeyboardInterrupt:
+                print("\n\n再见！")
+                break
+            except EOFError:
+                print("\n再见！")
+                break
+    finally:
+        # 退出或收到信号时写出尚未保存的修改
+        task_manager.close()
 
 # 6. 批处理模式
 print("\n=== 6. 批处理模式 ===")
@@ -397,14 +3623,14 @@ def batch_mode():
     ]
 
     print("添加示例任务...")
-    for title, priority, due_date, description in sample_tasks:
-        task_id = task_manager.add_task(title, priority, due_date, description)
+    task_ids = task_manager.add_tasks(sample_tasks)
+    for (title, _, _, _), task_id in zip(sample_tasks, task_ids):
         print(f"添加任务: {title} (ID: {task_id})")
 
     # 完成一些任务
     print("\n完成任务...")
-    task_manager.complete_task(1)
-    task_manager.complete_task(3)
+    task_manager.complete_task(task_ids[0])
+    task_manager.complete_task(task_ids[2])
 
     # 显示统计
     print("\n任务统计:")
@@ -417,6 +3643,42 @@ def batch_mode():
     tasks = task_manager.list_tasks(status='pending')
     formatter.print_task_table(tasks)
 
+def _stress_worker(job):
+    """压力测试的工作进程：逐个添加任务"""
+    filename, storage, worker, count = job
+    task_manager = create_task_manager(storage, filename)
+    task_ids = [task_manager.add_task(f"worker{worker}-{i}") for i in range(count)]
+    task_manager.close()
+    return task_ids
+
+
+def stress_test(processes: int = 4, count: int = 200, storage: str = "json"):
+    """并发写入压力测试：多个进程同时向同一个文件添加任务，检查没有丢失或重复"""
+    directory = tempfile.mkdtemp()
+    filename = os.path.join(directory, DEFAULT_FILENAMES[storage])
+    jobs = [(filename, storage, worker, count) for worker in range(processes)]
+
+    try:
+        start = datetime.now()
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.map(_stress_worker, jobs)
+        elapsed = (datetime.now() - start).total_seconds()
+
+        task_manager = create_task_manager(storage, filename)
+        titles = {task["title"] for task in task_manager.iter_tasks()}
+        task_manager.close()
+    finally:
+        shutil.rmtree(directory)
+
+    expected = processes * count
+    returned_ids = {task_id for task_ids in results for task_id in task_ids}
+    ok = len(titles) == expected and len(returned_ids) == expected
+
+    print(f"存储方式: {storage}，{processes} 个进程各添加 {count} 个任务，耗时 {elapsed:.2f} 秒")
+    print(f"期望任务数: {expected}，实际保存: {len(titles)}，分配的不同ID数: {len(returned_ids)}")
+    print("通过：没有丢失或重复的更新" if ok else "失败：存在丢失或重复的更新")
+    return ok
+
 # 7. 主程序入口
 print("\n=== 7. 主程序入口 ===")
 
@@ -437,9 +3699,26 @@ print("""
 1. 命令行模式：
    python 01命令行工具.py add "学习Python" --priority high --due-date 2024-12-31
    python 01命令行工具.py list --status pending
+   python 01命令行工具.py list --offset 100 --limit 50 --page-size 20
+   python 01命令行工具.py list --where "priority in (high, medium) and due_date <= today+7"
    python 01命令行工具.py complete 1
+   python 01命令行工具.py due --within 7d
+   python 01命令行工具.py overdue
+   python 01命令行工具.py search "Python OR 算法"
    python 01命令行工具.py stats
+   python 01命令行工具.py archive --older-than 30d
+   python 01命令行工具.py stats --include-archive
    python 01命令行工具.py export --format csv
+   python 01命令行工具.py export --filename done.ndjson.gz --status completed --since 2024-01-01
+   python 01命令行工具.py import tasks.ndjson
+   python 01命令行工具.py --storage journal add "学习Python"
+   python 01命令行工具.py --storage sqlite list --status pending
+   python 01命令行工具.py --storage binary stats
+   python 01命令行工具.py --storage sharded --shard-by month list --status pending
+   python 01命令行工具.py --storage journal remind --lead 2d
+   python 01命令行工具.py daemon    # 之后的命令会自动转发给守护进程
+   python task_client.py list --status pending    # 轻量客户端，转发时不加载本脚本
+   python 01命令行工具.py --storage journal stress --processes 8
 
 2. 交互式模式：
    python 01命令行工具.py
@@ -449,8 +3728,9 @@ print("""
    - 任务增删改查
    - 优先级管理
    - 状态跟踪
-   - 数据持久化
+   - 数据持久化（JSON全量保存 / 追加式日志 + 后台压缩 / SQLite / 二进制快照 / 分片）
    - 导出功能
+   - 截止日期提醒（分层时间轮）
    - 统计分析
    - 友好的界面
 """)
@@ -11,6 +11,13 @@ import seaborn as sns
 from datetime import datetime, timedelta
 import json
 import csv
+import os
+import sys
+import time
+import argparse
+import functools
+import multiprocessing
+from collections import deque
 from collections import Counter
 import random
 from typing import List, Dict, Any, Tuple
@@ -44,8 +51,24 @@ class DataGenerator:
 
     def generate_sales_data(self, num_records: int = 1000,
                             start_date: str = "2024-01-01",
-                            end_date: str = "2024-12-31") -> pd.DataFrame:
-        """生成销售数据"""
+                            end_date: str = "2024-12-31",
+                            vectorized: bool = False,
+                            seed: int = None,
+                            workers: int = 1) -> pd.DataFrame:
+        """生成销售数据
+
+        vectorized=True 时用NumPy按块生成整列（见 iter_sales_chunks），千万行也只需几秒，
+        workers 大于1时多进程并行；默认逐条生成，便于对照理解每个字段的含义。
+        给定 seed 时两种方式的结果都可以重现。
+        """
+        if vectorized:
+            chunks = list(self.iter_sales_chunks(num_records, start_date=start_date, end_date=end_date,
+                                                 seed=seed, workers=workers))
+            if len(chunks) == 1:
+                return chunks[0]
+            return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+        random_state = random.Random(seed)
         records = []
 
         start = datetime.strptime(start_date, "%Y-%m-%d")
@@ -53,24 +76,24 @@ class DataGenerator:
 
         for i in range(num_records):
             # 随机选择产品
-            product = random.choice(self.products)
+            product = random_state.choice(self.products)
 
             # 生成销售日期
             days_diff = (end - start).days
-            sale_date = start + timedelta(days=random.randint(0, days_diff))
+            sale_date = start + timedelta(days=random_state.randint(0, days_diff))
 
             # 生成销售数量
-            quantity = random.randint(1, 10)
+            quantity = random_state.randint(1, 10)
 
             # 生成折扣（0-0.5）
-            discount = random.uniform(0, 0.5)
+            discount = random_state.uniform(0, 0.5)
 
             # 计算总价
             total_price = product["price"] * quantity * (1 - discount)
 
             record = {
                 "订单ID": f"ORD{str(i+1).zfill(6)}",
-                "客户姓名": random.choice(self.customers),
+                "客户姓名": random_state.choice(self.customers),
                 "产品名称": product["name"],
                 "产品类别": product["category"],
                 "单价": product["price"],
@@ -78,22 +101,322 @@ class DataGenerator:
                 "折扣": round(discount, 2),
                 "总价": round(total_price, 2),
                 "销售日期": sale_date.strftime("%Y-%m-%d"),
-                "城市": random.choice(self.cities)
+                "城市": random_state.choice(self.cities)
             }
             records.append(record)
 
         return pd.DataFrame(records)
 
+    def iter_sales_chunks(self, num_records: int, chunk_size: int = 1_000_000,
+                          start_date: str = "2024-01-01", end_date: str = "2024-12-31",
+                          seed: int = None, workers: int = 1):
+        """逐块生成销售数据，每次产出最多 chunk_size 行的 DataFrame
+
+        配合 write_sales_data 可以生成上亿行的数据集，内存中始终只有几个数据块。
+
+        每块使用从 SeedSequence(seed) 派生（spawn）的独立随机数生成器，结果只取决于
+        seed 和 chunk_size。workers 大于1时各块在进程池中并行生成，按顺序产出，
+        与单进程生成的结果逐位相同；同时最多生成 2*workers 块，写入较慢时不会堆积在内存中。
+        """
+        starts = range(0, num_records, chunk_size)
+        seeds = np.random.SeedSequence(seed).spawn(len(starts))
+        jobs = [(self, seed_sequence, first_index, min(chunk_size, num_records - first_index),
+                 start_date, end_date)
+                for seed_sequence, first_index in zip(seeds, starts)]
+
+        if workers <= 1 or len(jobs) <= 1:
+            for job in jobs:
+                yield _generate_chunk(job)
+            return
+
+        with multiprocessing.Pool(min(workers, len(jobs))) as pool:
+            pending = deque()
+            for job in jobs:
+                pending.append(pool.apply_async(_generate_chunk, (job,)))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+
+    def _generate_columns(self, rng: np.random.Generator, first_index: int, num_records: int,
+                          start_date: str, end_date: str) -> Dict[str, np.ndarray]:
+        """用随机数生成器 rng 生成第 first_index 条起的 num_records 条记录，按列返回
+
+        产品、客户、城市先抽取下标再按下标取值，总价用数组运算得到，
+        销售日期是 datetime64 数组，不需要逐条格式化字符串。
+        """
+        start = np.datetime64(start_date, 'D')
+        days_diff = (np.datetime64(end_date, 'D') - start).astype(int)
+
+        product_index = rng.integers(0, len(self.products), num_records)
+        day_offsets = rng.integers(0, days_diff + 1, num_records)
+        quantities = rng.integers(1, 11, num_records)
+        discounts = rng.uniform(0, 0.5, num_records)
+        customer_index = rng.integers(0, len(self.customers), num_records)
+        city_index = rng.integers(0, len(self.cities), num_records)
+
+        names = np.array([p["name"] for p in self.products], dtype=object)
+        categories = np.array([p["category"] for p in self.products], dtype=object)
+        prices = np.array([p["price"] for p in self.products])[product_index]
+        order_numbers = np.arange(first_index + 1, first_index + num_records + 1).astype(str)
+
+        return {
+            "订单ID": np.char.add("ORD", np.char.zfill(order_numbers, 6)).astype(object),
+            "客户姓名": np.array(self.customers, dtype=object)[customer_index],
+            "产品名称": names[product_index],
+            "产品类别": categories[product_index],
+            "单价": prices,
+            "数量": quantities,
+            "折扣": np.round(discounts, 2),
+            "总价": np.round(prices * quantities * (1 - discounts), 2),
+            "销售日期": start + day_offsets,
+            "城市": np.array(self.cities, dtype=object)[city_index]
+        }
+
+
+def _generate_chunk(job) -> pd.DataFrame:
+    """生成一个数据块（在进程池的工作进程中执行）"""
+    generator, seed_sequence, first_index, count, start_date, end_date = job
+    rng = np.random.default_rng(seed_sequence)
+    return pd.DataFrame(generator._generate_columns(rng, first_index, count, start_date, end_date))
+
+
+class ColumnarWriter:
+    """二进制列式格式写入器
+
+    数据集是一个目录：schema.json 记录行数和每列的编码方式，每列单独存成文件。
+    追加数据块时只在各列文件末尾写入，内存占用只取决于数据块大小。
+
+    - number: 按原始 dtype 存成小端二进制数组（<列名>.bin）
+    - date: 存为自1970-01-01起的天数（int32）
+    - dictionary: 取值较少的字符串列，<列名>.bin 存 int32 编码，字典写在 schema 中
+    - string: 其余字符串列，<列名>.data 存 UTF-8 字节，<列名>.bin 存每行的结束偏移（int64）
+    """
+
+    MAX_DICTIONARY = 1 << 16
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        self.columns = None
+        self._files = {}
+        self._dictionaries = {}
+        self._offsets = {}
+        os.makedirs(path, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _open(self, filename: str):
+        f = self._files.get(filename)
+        if f is None:
+            f = self._files[filename] = open(os.path.join(self.path, filename), 'wb')
+        return f
+
+    def _plan(self, chunk: pd.DataFrame) -> List[Dict[str, str]]:
+        """根据第一个数据块确定每列的编码方式"""
+        columns = []
+        for name, values in chunk.items():
+            if pd.api.types.is_datetime64_any_dtype(values):
+                columns.append({"name": name, "kind": "date", "dtype": "<i4"})
+            elif pd.api.types.is_numeric_dtype(values):
+                columns.append({"name": name, "kind": "number", "dtype": values.dtype.newbyteorder('<').str})
+            elif values.nunique() <= min(self.MAX_DICTIONARY, len(values) // 2):
+                columns.append({"name": name, "kind": "dictionary", "dtype": "<i4"})
+                self._dictionaries[name] = {}
+            else:
+                columns.append({"name": name, "kind": "string", "dtype": "<i8"})
+                self._offsets[name] = 0
+        return columns
+
+    def append(self, chunk: pd.DataFrame):
+        """追加一个数据块（列必须与第一个数据块一致）"""
+        if self.columns is None:
+            self.columns = self._plan(chunk)
+        for column in self.columns:
+            name, kind = column["name"], column["kind"]
+            values = chunk[name]
+            f = self._open(f"{name}.bin")
+            if kind == "number":
+                f.write(values.to_numpy(column["dtype"]).tobytes())
+            elif kind == "date":
+                days = values.to_numpy('datetime64[D]').astype(np.int64)
+                f.write(days.astype(column["dtype"]).tobytes())
+            elif kind == "dictionary":
+                codes, uniques = pd.factorize(values)
+                if (codes < 0).any():
+                    raise ValueError(f"列 {name} 含有缺失值")
+                dictionary = self._dictionaries[name]
+                mapping = np.array([dictionary.setdefault(value, len(dictionary)) for value in uniques],
+                                   dtype=column["dtype"])
+                if len(dictionary) > self.MAX_DICTIONARY:
+                    raise ValueError(f"列 {name} 的取值超过 {self.MAX_DICTIONARY} 个，不能字典编码")
+                f.write(mapping[codes].tobytes())
+            else:
+                encoded = [value.encode('utf-8') for value in values]
+                lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+                ends = self._offsets[name] + np.cumsum(lengths)
+                self._open(f"{name}.data").write(b"".join(encoded))
+                f.write(ends.astype(column["dtype"]).tobytes())
+                if len(ends):
+                    self._offsets[name] = int(ends[-1])
+        self.rows += len(chunk)
+
+    def close(self):
+        """关闭各列文件并写入 schema.json"""
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+        for column in self.columns or []:
+            if column["kind"] == "dictionary":
+                column["dictionary"] = list(self._dictionaries[column["name"]])
+        with open(os.path.join(self.path, "schema.json"), 'w', encoding='utf-8') as f:
+            json.dump({"rows": self.rows, "columns": self.columns or []}, f, ensure_ascii=False, indent=2)
+
+
+def read_columnar(path: str, columns: List[str] = None) -> pd.DataFrame:
+    """读取 ColumnarWriter 写出的数据集（可以只读取部分列，字典编码的列读成 category）"""
+    with open(os.path.join(path, "schema.json"), 'r', encoding='utf-8') as f:
+        schema = json.load(f)
+
+    data = {}
+    for column in schema["columns"]:
+        name, kind = column["name"], column["kind"]
+        if columns is not None and name not in columns:
+            continue
+        values = np.fromfile(os.path.join(path, f"{name}.bin"), dtype=column["dtype"])
+        if kind == "date":
+            values = values.astype('datetime64[D]')
+        elif kind == "dictionary":
+            values = pd.Categorical.from_codes(values, categories=column["dictionary"])
+        elif kind == "string":
+            with open(os.path.join(path, f"{name}.data"), 'rb') as f:
+                blob = f.read()
+            starts = np.concatenate(([0], values[:-1]))
+            values = np.array([blob[start:end].decode('utf-8') for start, end in zip(starts, values)],
+                              dtype=object)
+        data[name] = values
+    return pd.DataFrame(data)
+
+
+def write_sales_data(chunks, filename: str, fmt: str = None) -> int:
+    """把数据块逐块写入CSV文件或二进制列式目录，返回写入的行数
+
+    fmt 为 "csv" 或 "columnar"，默认按文件名判断（以 .csv 结尾为CSV）。
+    """
+    fmt = fmt or ("csv" if filename.endswith(".csv") else "columnar")
+    if fmt == "csv":
+        rows = 0
+        with open(filename, 'w', newline='', encoding='utf-8') as f:
+            for chunk in chunks:
+                chunk.to_csv(f, header=(rows == 0), index=False)
+                rows += len(chunk)
+        return rows
+    if fmt == "columnar":
+        with ColumnarWriter(filename) as writer:
+            for chunk in chunks:
+                writer.append(chunk)
+        return writer.rows
+    raise ValueError(f"不支持的格式: {fmt}")
+
 # 2. 数据分析器
 print("\n=== 2. 数据分析器 ===")
 
+def memoized(method):
+    """缓存分析结果：按方法名和参数缓存，数据版本号（version）变化后重新计算
+
+    返回结果的副本，调用者修改结果（如替换索引）不会影响缓存。
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._cache_version != self.version:
+            self._cache.clear()
+            self._cache_version = self.version
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        if key in self._cache:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+            self._cache[key] = method(self, *args, **kwargs)
+        result = self._cache[key]
+        return result.copy() if hasattr(result, "copy") else result
+    return wrapper
+
+
 class SalesAnalyzer:
-    """销售数据分析器"""
+    """销售数据分析器
 
-    def __init__(self, data: pd.DataFrame):
-        self.data = data
-        self.data['销售日期'] = pd.to_datetime(self.data['销售日期'])
+    创建时先压缩列的类型（optimize=False 时跳过）：客户、产品、类别、城市转为 category，
+    分组统计直接在整数编码上进行；折扣降为 float32，数量、单价最小只降到 int32，
+    单价×数量这类运算不会像 int8/int16 那样静默溢出。
+
+    各分析方法的结果会被缓存（见 memoized），可视化和报告重复调用时不再重新计算。
+    通过 add_records / optimize_dtypes 修改数据会增加版本号使缓存失效；
+    直接修改 self.data 后需要调用 mark_changed()。
+    """
 
+    CATEGORY_COLUMNS = ['客户姓名', '产品名称', '产品类别', '城市']
+    # 数值列 -> 保存的小数位数（None 表示整数）
+    DOWNCAST_COLUMNS = {'数量': None, '单价': None, '折扣': 2}
+
+    def __init__(self, data: pd.DataFrame, optimize: bool = True):
+        # 转换日期和压缩类型都会修改 self.data，在副本上进行，调用者的 data 保持不变
+        self.data = data.copy()
+        self.data['销售日期'] = pd.to_datetime(self.data['销售日期'])
+        self.version = 0
+        self._cache = {}
+        self._cache_version = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.optimize = optimize
+        self.memory_report = self.optimize_dtypes() if optimize else None
+
+    def mark_changed(self):
+        """数据已被修改：增加版本号，之前缓存的分析结果失效"""
+        self.version += 1
+
+    def add_records(self, records: pd.DataFrame):
+        """追加销售记录"""
+        records = records.copy()
+        records['销售日期'] = pd.to_datetime(records['销售日期'])
+        # 类别不同的 category 列合并后会变回字符串，合并后重新压缩
+        self.data = pd.concat([self.data, records], ignore_index=True)
+        self.mark_changed()
+        if self.optimize:
+            self.memory_report = self.optimize_dtypes()
+
+    def optimize_dtypes(self) -> Dict[str, int]:
+        """压缩列的类型，返回压缩前后的内存占用（字节）"""
+        before = int(self.data.memory_usage(deep=True).sum())
+
+        for column in self.CATEGORY_COLUMNS:
+            values = self.data[column]
+            # 不同取值超过一半时编码反而更占空间
+            if not isinstance(values.dtype, pd.CategoricalDtype) and values.nunique() <= len(values) // 2:
+                self.data[column] = values.astype('category')
+
+        for column, decimals in self.DOWNCAST_COLUMNS.items():
+            values = self.data[column]
+            if decimals is None:
+                # 整数列参与金额计算，最小只降到 int32
+                int32 = np.iinfo(np.int32)
+                if pd.api.types.is_integer_dtype(values) and len(values) and \
+                        int32.min <= values.min() and values.max() <= int32.max:
+                    self.data[column] = values.astype(np.int32)
+                continue
+            # float32 只有约7位有效数字，取回时能按原来的小数位数还原才降级
+            downcast = values.astype(np.float32)
+            if np.array_equal(downcast.astype(np.float64).round(decimals), values):
+                self.data[column] = downcast
+
+        after = int(self.data.memory_usage(deep=True).sum())
+        self.mark_changed()
+        return {"before": before, "after": after, "saved": before - after}
+
+    @memoized
     def basic_statistics(self) -> Dict[str, Any]:
         """基本统计信息"""
         return {
@@ -106,15 +429,17 @@ class SalesAnalyzer:
             "总产品数": self.data['产品名称'].nunique()
         }
 
+    @memoized
     def category_analysis(self) -> pd.DataFrame:
         """产品类别分析"""
-        category_stats = self.data.groupby('产品类别').agg({
+        category_stats = self.data.groupby('产品类别', observed=True).agg({
             '总价': ['sum', 'count', 'mean'],
             '数量': 'sum'
         }).round(2)
         category_stats.columns = ['总销售额', '订单数', '平均订单金额', '总数量']
         return category_stats
 
+    @memoized
     def monthly_analysis(self) -> pd.DataFrame:
         """月度销售分析"""
         monthly_data = self.data.copy()
@@ -128,27 +453,30 @@ class SalesAnalyzer:
         monthly_stats.columns = ['月销售额', '月订单数', '月客户数']
         return monthly_stats
 
+    @memoized
     def city_analysis(self) -> pd.DataFrame:
         """城市销售分析"""
-        city_stats = self.data.groupby('城市').agg({
+        city_stats = self.data.groupby('城市', observed=True).agg({
             '总价': ['sum', 'count', 'mean'],
             '客户姓名': 'nunique'
         }).round(2)
         city_stats.columns = ['城市销售额', '订单数', '平均订单金额', '客户数']
         return city_stats
 
+    @memoized
     def customer_analysis(self) -> pd.DataFrame:
         """客户分析"""
-        customer_stats = self.data.groupby('客户姓名').agg({
+        customer_stats = self.data.groupby('客户姓名', observed=True).agg({
             '总价': ['sum', 'count', 'mean'],
             '产品名称': 'nunique'
         }).round(2)
         customer_stats.columns = ['客户总消费', '订单数', '平均订单金额', '购买产品种类']
         return customer_stats
 
+    @memoized
     def product_analysis(self) -> pd.DataFrame:
         """产品分析"""
-        product_stats = self.data.groupby('产品名称').agg({
+        product_stats = self.data.groupby('产品名称', observed=True).agg({
             '总价': 'sum',
             '数量': 'sum',
             '订单ID': 'count'
@@ -156,6 +484,7 @@ class SalesAnalyzer:
         product_stats.columns = ['总销售额', '总销量', '订单数']
         return product_stats.sort_values('总销售额', ascending=False)
 
+    @memoized
     def time_series_analysis(self) -> pd.DataFrame:
         """时间序列分析"""
         daily_sales = self.data.groupby('销售日期')['总价'].sum().reset_index()
@@ -440,15 +769,18 @@ def main():
 
     # 1. 生成数据
     generator = DataGenerator()
-    data = generator.generate_sales_data(num_records=500)
+    data = generator.generate_sales_data(num_records=500, vectorized=True)
     print(f"生成了 {len(data)} 条销售记录")
 
     # 保存原始数据
     data.to_csv("sales_data.csv", index=False, encoding='utf-8')
     print("原始数据已保存到 sales_data.csv")
 
-    # 2. 创建分析器
+    # 2. 创建分析器（同时压缩列的类型）
     analyzer = SalesAnalyzer(data)
+    report = analyzer.memory_report
+    print(f"内存占用: {report['before'] / 1024:,.1f} KB -> {report['after'] / 1024:,.1f} KB "
+          f"(节省 {report['saved'] / report['before']:.0%})")
 
     # 3. 分析数据
     print("\n=== 基本统计信息 ===")
@@ -498,6 +830,7 @@ def main():
     report_generator.generate_html_report("sales_analysis_report.html")
     report_generator.generate_csv_report("sales_analysis_report.csv")
 
+    print(f"\n分析结果缓存: 计算 {analyzer.cache_misses} 次，复用 {analyzer.cache_hits} 次")
     print("\n数据分析完成！")
     print("生成的文件:")
     print("- sales_data.csv (原始数据)")
@@ -514,7 +847,7 @@ def interactive_analysis():
 
     # 生成数据
     generator = DataGenerator()
-    data = generator.generate_sales_data(num_records=200)
+    data = generator.generate_sales_data(num_records=200, vectorized=True)
     analyzer = SalesAnalyzer(data)
 
     while True:
@@ -576,30 +909,65 @@ def interactive_analysis():
         else:
             print("无效选择，请重试")
 
+# 7. 生成大规模数据集
+print("\n=== 7. 生成大规模数据集 ===")
+
+def generate_dataset(argv: List[str] = None):
+    """逐块生成销售数据并写入文件，用于制作压测数据集"""
+    parser = argparse.ArgumentParser(prog="02数据分析.py generate",
+                                     description="逐块生成销售数据，内存占用与总行数无关")
+    parser.add_argument('rows', type=int, help='总行数')
+    parser.add_argument('filename', help='输出文件，以 .csv 结尾时写CSV，否则写二进制列式目录')
+    parser.add_argument('--format', choices=['csv', 'columnar'], help='输出格式 (默认按文件名判断)')
+    parser.add_argument('--chunk-size', type=int, default=1_000_000, help='每块行数 (默认100万)')
+    parser.add_argument('--seed', type=int, help='随机种子 (默认随机生成并输出，用于重现)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='并行生成的进程数 (默认CPU核数，不影响生成结果)')
+    parser.add_argument('--start-date', default="2024-01-01", help='起始日期')
+    parser.add_argument('--end-date', default="2024-12-31", help='结束日期')
+    args = parser.parse_args(argv)
+
+    if args.seed is None:
+        args.seed = np.random.SeedSequence().entropy
+        print(f"随机种子: {args.seed}")
+
+    generator = DataGenerator()
+    chunks = generator.iter_sales_chunks(args.rows, args.chunk_size, args.start_date,
+                                         args.end_date, args.seed, args.workers)
+    start = time.perf_counter()
+    rows = write_sales_data(chunks, args.filename, args.format)
+    elapsed = time.perf_counter() - start
+    print(f"已写入 {rows:,} 行到 {args.filename}，耗时 {elapsed:.1f} 秒 "
+          f"({rows / elapsed if elapsed else 0:,.0f} 行/秒)")
+
 # 程序入口
 if __name__ == "__main__":
-    # 检查是否安装了必要的库
-    required_libraries = ['pandas', 'numpy', 'matplotlib', 'seaborn']
-    missing_libraries = []
-
-    for lib in required_libraries:
-        try:
-            __import__(lib)
-        except ImportError:
-            missing_libraries.append(lib)
-
-    if missing_libraries:
-        print(f"缺少必要的库: {', '.join(missing_libraries)}")
-        print("请运行以下命令安装:")
-        print(f"pip install {' '.join(missing_libraries)}")
-        print("\n运行完整分析示例:")
-        main()
+    if len(sys.argv) > 1 and sys.argv[1] == "generate":
+        # 例如：python 02数据分析.py generate 100000000 sales.csv --chunk-size 2000000
+        generate_dataset(sys.argv[2:])
     else:
-        print("库检查通过，开始分析...")
-        # 取消注释以下行来运行完整分析
-        # main()
+        # 检查是否安装了必要的库
+        required_libraries = ['pandas', 'numpy', 'matplotlib', 'seaborn']
+        missing_libraries = []
+
+        for lib in required_libraries:
+            try:
+                __import__(lib)
+            except ImportError:
+                missing_libraries.append(lib)
+
+        if missing_libraries:
+            print(f"缺少必要的库: {', '.join(missing_libraries)}")
+            print("请运行以下命令安装:")
+            print(f"pip install {' '.join(missing_libraries)}")
+            print("\n运行完整分析示例:")
+            main()
+        else:
+            print("库检查通过，开始分析...")
+            # 取消注释以下行来运行完整分析
+            # main()
 
-        # 运行交互式分析
-        interactive_analysis()
+            # 运行交互式分析
+            interactive_analysis()
 
 print("\n程序执行完毕！")
\ No newline at end of file
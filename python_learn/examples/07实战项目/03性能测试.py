@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务管理器性能测试示例
+
+测量 01命令行工具.py 中 TaskManager 各种存储方式在不同数据量下的表现，
+结果保存为JSON，可以与之前保存的基线对比，找出性能退化。
+"""
+
+import argparse
+import contextlib
+import glob
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+print("=== 任务管理器性能测试示例 ===")
+
+# 1. 加载被测模块
+print("\n=== 1. 加载被测模块 ===")
+
+CLI_SCRIPT = glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "01*.py"))[0]
+
+
+def load_cli_module():
+    """按文件路径导入 01命令行工具.py（文件名不是合法的模块名），屏蔽它导入时的输出"""
+    spec = importlib.util.spec_from_file_location("task_cli", CLI_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    # 注册到 sys.modules，多进程 pickle 时才能找到其中的函数
+    sys.modules["task_cli"] = module
+    with contextlib.redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(module)
+    return module
+
+
+# 2. 计时工具
+print("\n=== 2. 计时工具 ===")
+
+
+def summarize(durations: List[float]) -> Dict[str, float]:
+    """把每次操作的耗时（秒）汇总成平均值、分位数和吞吐量"""
+    durations = sorted(durations)
+    total = sum(durations)
+    return {
+        "count": len(durations),
+        "mean_ms": total / len(durations) * 1000,
+        "p50_ms": durations[len(durations) // 2] * 1000,
+        "p95_ms": durations[min(len(durations) - 1, int(len(durations) * 0.95))] * 1000,
+        "ops_per_s": len(durations) / total if total else float("inf"),
+    }
+
+
+def measure(func: Callable, args_list) -> Dict[str, float]:
+    """对 args_list 中的每组参数调用一次 func 并逐次计时"""
+    durations = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        durations.append(time.perf_counter() - start)
+    return summarize(durations)
+
+
+def timed(func: Callable, *args) -> float:
+    """调用一次 func，返回耗时（秒）"""
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+# 3. 基准场景
+print("\n=== 3. 基准场景 ===")
+
+SIZE_NAMES = {"k": 1000, "m": 1000000}
+
+
+def parse_size(text: str) -> int:
+    """解析数据量，如 1000、100k、1m"""
+    text = text.strip().lower()
+    if text and text[-1] in SIZE_NAMES:
+        return int(float(text[:-1]) * SIZE_NAMES[text[-1]])
+    return int(text)
+
+
+def generate_tasks(count: int, seed: int = 0):
+    """生成 count 个 (标题, 优先级, 截止日期, 描述) 元组"""
+    rng = random.Random(seed)
+    words = ["学习", "Python", "编写", "文档", "测试", "部署", "review", "重构", "算法", "数据库"]
+    priorities = ["low", "medium", "high"]
+    today = date.today()
+    for i in range(count):
+        due = today + timedelta(days=rng.randint(-30, 90)) if rng.random() < 0.5 else None
+        yield (
+            f"{rng.choice(words)}{rng.choice(words)} #{i}",
+            rng.choice(priorities),
+            due.isoformat() if due else None,
+            " ".join(rng.choices(words, k=5)),
+        )
+
+
+def populate(cli, storage: str, filename: str, size: int, batch_size: int = 100000) -> float:
+    """批量写入 size 个任务，返回耗时（秒）"""
+    start = time.perf_counter()
+    task_manager = cli.create_task_manager(storage, filename)
+    batch = []
+    for item in generate_tasks(size):
+        batch.append(item)
+        if len(batch) >= batch_size:
+            task_manager.add_tasks(batch)
+            batch = []
+    if batch:
+        task_manager.add_tasks(batch)
+    task_manager.close()
+    return time.perf_counter() - start
+
+
+def drain(tasks) -> int:
+    """遍历结果并组装每个任务（list 命令输出前要做的工作）"""
+    count = 0
+    for _ in tasks:
+        count += 1
+    return count
+
+
+def bench_startup(cli, storage: str, filename: str) -> Dict[str, float]:
+    """测量加载时间和加载后的内存峰值"""
+    result = {}
+    start = time.perf_counter()
+    task_manager = cli.create_task_manager(storage, filename)
+    result["load_s"] = time.perf_counter() - start
+    # 二进制存储按需加载，第一次访问全部任务时才真正解析
+    result["first_list_s"] = timed(lambda: drain(task_manager.list_tasks()))
+    task_manager.close()
+
+    tracemalloc.start()
+    try:
+        task_manager = cli.create_task_manager(storage, filename)
+        drain(task_manager.list_tasks())
+        current, peak = tracemalloc.get_traced_memory()
+        task_manager.close()
+    finally:
+        tracemalloc.stop()
+    result["resident_mb"] = current / 1024 / 1024
+    result["peak_mb"] = peak / 1024 / 1024
+    return result
+
+
+def bench_cli(storage: str, workdir: str, repeat: int = 3) -> Dict[str, float]:
+    """测量命令行入口（新进程）执行 stats 的耗时，取最快一次"""
+    command = [sys.executable, CLI_SCRIPT, "--no-daemon", "--storage", storage, "stats"]
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=workdir, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, check=True)
+        durations.append(time.perf_counter() - start)
+    return {"cli_stats_s": min(durations)}
+
+
+def bench_operations(cli, storage: str, filename: str, size: int, ops: int) -> Dict[str, Any]:
+    """测量单个操作的延迟：添加、完成、删除、列表、统计、导出"""
+    rng = random.Random(size)
+    task_manager = cli.create_task_manager(storage, filename)
+    result = {}
+
+    new_tasks = list(generate_tasks(ops, seed=size + 1))
+    added = []
+    result["add"] = measure(lambda *item: added.append(task_manager.add_task(*item)), new_tasks)
+
+    # 完成和删除都从原有任务中随机挑选，互不重叠
+    ids = rng.sample(range(1, size + 1), min(size, ops * 2))
+    result["complete"] = measure(task_manager.complete_task, [(i,) for i in ids[:ops]])
+    result["delete"] = measure(task_manager.delete_task, [(i,) for i in ids[ops:]])
+
+    result["list_all"] = measure(lambda: drain(task_manager.list_tasks()), [()] * 3)
+    result["list_filtered"] = measure(
+        lambda: drain(task_manager.list_tasks(status="pending", priority="high")), [()] * 3)
+    page = io.StringIO()
+    result["list_first_page"] = measure(
+        lambda: cli.OutputFormatter.print_task_table(task_manager.list_tasks(), limit=50, out=page),
+        [()] * 10)
+    result["stats"] = measure(task_manager.get_task_stats, [()] * 100)
+
+    export_dir = os.path.dirname(filename)
+    result["export_csv_s"] = timed(task_manager.export_to_csv, os.path.join(export_dir, "export.csv"))
+    result["export_json_s"] = timed(task_manager.export_to_json, os.path.join(export_dir, "export.json"))
+    task_manager.close()
+    return result
+
+
+def run_benchmark(cli, storages: List[str], sizes: List[int], ops: int, cli_startup: bool = True):
+    """按 存储方式 x 数据量 运行全部场景，返回 {"json/1000": {...}} 形式的结果"""
+    results = {}
+    for storage in storages:
+        for size in sizes:
+            key = f"{storage}/{size}"
+            print(f"\n[{key}]")
+            workdir = tempfile.mkdtemp(prefix="task_bench_")
+            try:
+                filename = os.path.join(workdir, cli.DEFAULT_FILENAMES[storage])
+                result = {"populate_s": populate(cli, storage, filename, size)}
+                result["populate_ops_per_s"] = size / result["populate_s"]
+                print(f"  写入 {size} 个任务: {result['populate_s']:.2f}s")
+                result.update(bench_startup(cli, storage, filename))
+                print(f"  加载: {result['load_s']:.3f}s，内存峰值: {result['peak_mb']:.1f}MB")
+                if cli_startup:
+                    result.update(bench_cli(storage, workdir))
+                    print(f"  命令行 stats: {result['cli_stats_s']:.3f}s")
+                result.update(bench_operations(cli, storage, filename, size, ops))
+                for name in ("add", "complete", "delete", "list_all", "stats"):
+                    print(f"  {name}: 平均 {result[name]['mean_ms']:.3f}ms，"
+                          f"p95 {result[name]['p95_ms']:.3f}ms")
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+            results[key] = result
+    return results
+
+
+# 4. 基线对比
+print("\n=== 4. 基线对比 ===")
+
+
+def flatten(result: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """把嵌套的结果展开成 {"add.mean_ms": 1.2, ...}"""
+    flat = {}
+    for name, value in result.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{name}."))
+        else:
+            flat[f"{prefix}{name}"] = value
+    return flat
+
+
+def compare_with_baseline(results: Dict[str, Any], baseline: Dict[str, Any],
+                          threshold: float = 0.2) -> List[str]:
+    """对比两次结果，返回变差超过 threshold 的指标描述
+
+    以 ops_per_s 结尾的指标越大越好，耗时（_s / _ms）和内存（_mb）越小越好。
+    """
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        old = flatten(baseline[key])
+        for metric, value in flatten(result).items():
+            before = old.get(metric)
+            if not before or metric.endswith("count"):
+                continue
+            if metric.endswith("ops_per_s"):
+                change = (before - value) / before
+            elif metric.endswith(("_s", "_ms", "_mb")):
+                change = (value - before) / before
+            else:
+                continue
+            if change > threshold:
+                regressions.append(f"{key} {metric}: {before:.4g} -> {value:.4g} (变差 {change:.0%})")
+    return regressions
+
+
+# 5. 主程序
+print("\n=== 5. 主程序 ===")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="任务管理器性能测试",
+        epilog="""
+示例:
+  python 03性能测试.py --sizes 1k,100k --storage json,journal
+  python 03性能测试.py --output baseline.json
+  python 03性能测试.py --baseline baseline.json --threshold 0.2
+        """,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--sizes", default="1k,100k,1m", help="数据量，逗号分隔 (默认 1k,100k,1m)")
+    parser.add_argument("--storage", default="json,journal,sqlite,binary,sharded",
+                        help="存储方式，逗号分隔 (默认全部)")
+    parser.add_argument("--ops", type=int, default=20, help="每种单个操作的测量次数 (默认20)")
+    parser.add_argument("--no-cli", action="store_true", help="不测量命令行入口的启动时间")
+    parser.add_argument("--output", help="把结果写入JSON文件")
+    parser.add_argument("--baseline", help="与之前保存的结果对比")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定为退化的变差比例 (默认0.2)")
+    args = parser.parse_args(argv)
+
+    cli = load_cli_module()
+    storages = [name.strip() for name in args.storage.split(",") if name.strip()]
+    for storage in storages:
+        if storage not in cli.DEFAULT_FILENAMES:
+            parser.error(f"未知的存储方式: {storage}")
+    sizes = [parse_size(text) for text in args.sizes.split(",") if text.strip()]
+
+    report = {
+        "meta": {
+            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "ops": args.ops,
+        },
+        "results": run_benchmark(cli, storages, sizes, args.ops, not args.no_cli),
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到 {args.output}")
+    else:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(report["results"], baseline["results"], args.threshold)
+        if regressions:
+            print(f"\n发现 {len(regressions)} 项性能退化:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\n没有发现性能退化")
+    return 0
+
+
+# 程序入口
+if __name__ == "__main__":
+    sys.exit(main())
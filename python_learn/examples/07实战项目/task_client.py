@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务命令行工具的轻量客户端
+
+01命令行工具.py 有三千多行，还要导入 sqlite3、multiprocessing 等模块，每次启动
+光编译和导入就要上百毫秒。守护进程运行时命令只需转发给它：本模块只依赖
+sys、os、json、socket，在加载完整脚本之前完成转发。
+
+    python task_client.py list --status pending
+
+守护进程不可用、或命令需要在本进程运行（daemon、stress、remind、交互式模式）时，
+自动回退到完整的 01命令行工具.py。
+"""
+
+import sys
+import os
+import json
+import socket
+
+CLI_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "01命令行工具.py")
+
+# 可以转发给守护进程的子命令，其余命令（以及参数有误的命令）交给完整脚本处理
+FORWARD_COMMANDS = {"add", "list", "due", "overdue", "search", "complete", "delete",
+                    "stats", "archive", "import", "export"}
+# 子命令之前的全局选项：值表示该选项是否带参数
+GLOBAL_OPTIONS = {"--storage": True, "--socket": True, "--no-daemon": False,
+                  "--shard-by": True, "--shard-size": True}
+# 等待守护进程响应的秒数，超时（守护进程卡住）时回退到本进程执行
+DAEMON_TIMEOUT = 5.0
+# 本进程内已经超时过的套接字，之后不再尝试，免得完整脚本再各等一次
+_stalled_sockets = set()
+
+
+def send_to_daemon(socket_path: str, storage: str, argv):
+    """把命令发送给守护进程，返回其输出；守护进程不可用时返回None"""
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(socket_path):
+        return None
+    if os.path.abspath(socket_path) in _stalled_sockets:
+        return None
+
+    request = {"storage": storage, "argv": argv, "cwd": os.getcwd()}
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(DAEMON_TIMEOUT)
+            sock.connect(socket_path)
+            sock.sendall((json.dumps(request, ensure_ascii=False) + "\n").encode('utf-8'))
+            with sock.makefile('rb') as f:
+                response = json.loads(f.readline().decode('utf-8'))
+    except socket.timeout:
+        _stalled_sockets.add(os.path.abspath(socket_path))
+        return None
+    except (OSError, ValueError):
+        return None
+
+    return response["output"] if response["ok"] else None
+
+
+def parse_global_options(argv):
+    """找出全局选项和子命令，返回 (options, command)
+
+    只识别 create_parser() 中的全局选项；遇到 -h、选项缩写等其他写法时返回None，
+    交给 argparse 处理。
+    """
+    options = {"--storage": os.environ.get('TASK_STORAGE', 'json'),
+               "--socket": os.environ.get('TASK_SOCKET', 'tasks.sock'),
+               "--no-daemon": False}
+    args = iter(argv)
+    for arg in args:
+        if not arg.startswith("-"):
+            return options, arg
+        name, sep, value = arg.partition("=")
+        if name not in GLOBAL_OPTIONS or (sep and not GLOBAL_OPTIONS[name]):
+            return None
+        if not GLOBAL_OPTIONS[name]:
+            value = True
+        elif not sep:
+            value = next(args, None)
+            if value is None:
+                return None
+        options[name] = value
+    return None
+
+
+def forward(argv) -> bool:
+    """守护进程可用时把命令转发给它并打印输出，返回是否已处理"""
+    parsed = parse_global_options(argv)
+    if parsed is None:
+        return False
+    options, command = parsed
+    if options["--no-daemon"] or command not in FORWARD_COMMANDS:
+        return False
+
+    output = send_to_daemon(options["--socket"], options["--storage"], argv)
+    if output is None:
+        return False
+    print(output, end='')
+    return True
+
+
+if __name__ == "__main__":
+    if not forward(sys.argv[1:]):
+        import runpy
+        # 完整脚本导入 task_client 时复用本模块，共享超时记录
+        sys.modules.setdefault("task_client", sys.modules[__name__])
+        sys.argv[0] = CLI_SCRIPT
+        runpy.run_path(CLI_SCRIPT, run_name="__main__")